@@ -57,6 +57,55 @@ class AIConfig:
     API_TIMEOUT = 30
     MAX_RETRIES = 3
     
+    # Vision image preprocessing (services/image_preprocessor.py)
+    VISION_MAX_SIDE = int(os.getenv('VISION_MAX_SIDE', '1024'))  # px, longest side sent to the model
+    VISION_IMAGE_FORMAT = os.getenv('VISION_IMAGE_FORMAT', 'JPEG')  # JPEG or WEBP
+    VISION_IMAGE_QUALITY = int(os.getenv('VISION_IMAGE_QUALITY', '85'))
+    VISION_MAX_DOWNLOAD_MB = 20
+    VISION_PREFETCH_TTL = 120  # seconds a speculative default-question analysis waits for the user
+    
+    # Payment proof index (services/proof_index.py): max differing dHash bits for a duplicate (<= 3)
+    PROOF_MATCH_DISTANCE = int(os.getenv('PROOF_MATCH_DISTANCE', '3'))
+    
+    # Fallback chain (comma-separated, tried after AI_MODEL) and hedged requests (services/model_router.py)
+    FALLBACK_MODELS = [model.strip() for model in os.getenv('AI_FALLBACK_MODELS', '').split(',') if model.strip()]
+    HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'True').lower() == 'true'
+    HEDGE_DEFAULT_DELAY = float(os.getenv('AI_HEDGE_DEFAULT_DELAY', '8'))  # seconds, until a model has enough samples
+    HEDGE_MIN_DELAY = 1.0  # seconds, floor for the p90-based threshold
+    HEDGE_MIN_SAMPLES = 20
+    LATENCY_WINDOW = 200  # latest successful calls kept per model
+    
+    # Usage accounting (services/ai_usage.py)
+    USAGE_FLUSH_SIZE = 50  # buffered calls per batched insert
+    USAGE_FLUSH_INTERVAL = 30  # seconds, flush at least this often
+    # USD per million tokens, used when OpenRouter doesn't report the cost: "model=in/out,model=in/out"
+    MODEL_PRICES = {
+        entry.split('=')[0].strip(): tuple(float(price) for price in entry.split('=')[1].split('/'))
+        for entry in os.getenv('AI_MODEL_PRICES', '').split(',') if '=' in entry
+    }
+    
+    # Request scheduler (services/ai_scheduler.py)
+    MAX_CONCURRENT_REQUESTS = int(os.getenv('AI_MAX_CONCURRENT_REQUESTS', '4'))
+    RATE_LIMIT_BACKOFF = 2  # seconds after the first 429 without Retry-After, doubles per repeat
+    RATE_LIMIT_MAX_BACKOFF = 60  # seconds
+    
+    # Bulk caption refresh (services/caption_job.py)
+    CAPTION_JOB_CONCURRENCY = int(os.getenv('CAPTION_JOB_CONCURRENCY', '3'))  # keep below MAX_CONCURRENT_REQUESTS
+    CAPTION_JOB_BATCH_SIZE = int(os.getenv('CAPTION_JOB_BATCH_SIZE', '25'))  # courses per checkpoint
+    
+    # Streamed replies: seconds between progressive message edits
+    STREAM_EDIT_INTERVAL = float(os.getenv('AI_STREAM_EDIT_INTERVAL', '1.0'))
+    
+    # Response cache (services/ai_cache.py), repeat prompts skip the API
+    CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'True').lower() == 'true'
+    CACHE_SIZE = int(os.getenv('AI_CACHE_SIZE', '500'))  # in-memory entries
+    CACHE_TTL = int(os.getenv('AI_CACHE_TTL', '86400'))  # seconds (24 hours)
+    
+    # Shared HTTP connection pool (services/http_session.py)
+    HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '20'))  # max open connections
+    HTTP_KEEPALIVE = 75  # seconds an idle connection is kept open
+    HTTP_DNS_TTL = 300  # seconds DNS lookups are cached
+    
     # Temperature and top_p for generation
     TEMPERATURE = 0.7
     TOP_P = 0.9
@@ -110,6 +159,29 @@ class AppConfig:
     BROADCAST_DELAY = float(os.getenv('BROADCAST_DELAY', '0.1'))  # seconds between broadcasts
     MAX_BROADCAST_SIZE = int(os.getenv('MAX_BROADCAST_SIZE', '100'))  # batch size
     
+    # Admin sessions (sliding: each dashboard action restarts the timer)
+    ADMIN_SESSION_TIMEOUT = int(os.getenv('ADMIN_SESSION_TIMEOUT', '30'))  # minutes
+    
+    # Update processing (each in-flight update pins one DB connection)
+    MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '1'))
+    
+    # Force join membership cache (seconds, "left" results expire sooner)
+    MEMBERSHIP_CACHE_SIZE = int(os.getenv('MEMBERSHIP_CACHE_SIZE', '100000'))
+    MEMBERSHIP_POSITIVE_TTL = int(os.getenv('MEMBERSHIP_POSITIVE_TTL', '600'))
+    MEMBERSHIP_NEGATIVE_TTL = int(os.getenv('MEMBERSHIP_NEGATIVE_TTL', '30'))
+    MEMBERSHIP_RECORD_TTL = int(os.getenv('MEMBERSHIP_RECORD_TTL', '86400'))  # statuses from chat_member updates
+    MEMBERSHIP_CHECK_CONCURRENCY = int(os.getenv('MEMBERSHIP_CHECK_CONCURRENCY', '10'))  # parallel get_chat_member calls
+    MEMBERSHIP_CHECK_TIMEOUT = float(os.getenv('MEMBERSHIP_CHECK_TIMEOUT', '5'))  # seconds per call
+    MEMBERSHIP_BREAKER_THRESHOLD = int(os.getenv('MEMBERSHIP_BREAKER_THRESHOLD', '3'))  # failures before a channel is paused
+    MEMBERSHIP_BREAKER_COOLDOWN = int(os.getenv('MEMBERSHIP_BREAKER_COOLDOWN', '300'))  # seconds paused
+    
+    # Background re-verification of verified users (force join)
+    REVERIFY_ENABLED = os.getenv('REVERIFY_ENABLED', 'True').lower() == 'true'
+    REVERIFY_BATCH_SIZE = int(os.getenv('REVERIFY_BATCH_SIZE', '200'))
+    REVERIFY_API_RATE = float(os.getenv('REVERIFY_API_RATE', '5'))  # get_chat_member calls per second
+    REVERIFY_ACTIVE_DAYS = int(os.getenv('REVERIFY_ACTIVE_DAYS', '30'))  # skip users idle longer than this
+    REVERIFY_INTERVAL = int(os.getenv('REVERIFY_INTERVAL', '3600'))  # seconds between full sweeps
+    
     # Features - FIXED: Get string value first before calling .lower()
     ENABLE_COURSES = os.getenv('ENABLE_COURSES', 'True').lower() == 'true'
     ENABLE_PAYMENTS = os.getenv('ENABLE_PAYMENTS', 'True').lower() == 'true'
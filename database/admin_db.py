@@ -17,6 +17,8 @@ class AdminDatabase:
     @staticmethod
     async def is_admin(user_id: int) -> bool:
         """Check if user is admin"""
+        if db.admins.loaded:
+            return db.admins.is_admin(user_id)
         try:
             query = "SELECT EXISTS(SELECT 1 FROM admins WHERE user_id = $1 AND active = true)"
             result = await db.fetchval(query, user_id)
@@ -33,9 +35,12 @@ class AdminDatabase:
                 INSERT INTO admins (user_id, name, role, added_by, added_at, active)
                 VALUES ($1, $2, $3, $4, $5, true)
                 ON CONFLICT (user_id) DO UPDATE SET active = true
-                RETURNING id
+                RETURNING *
             """
-            result = await db.fetchval(query, user_id, name, role, added_by, datetime.now())
+            result = await db.fetchrow(query, user_id, name, role, added_by, datetime.now())
+            if result:
+                db.admins.set(result)
+            await db.invalidation.publish('admins', user_id, local=False)
             logger.info(f"✅ Admin added: {user_id} ({name})")
             return True if result else False
         except Exception as e:
@@ -48,6 +53,8 @@ class AdminDatabase:
         try:
             query = "UPDATE admins SET active = false WHERE user_id = $1"
             await db.execute(query, user_id)
+            db.admins.discard(user_id)
+            await db.invalidation.publish('admins', user_id, local=False)
             logger.info(f"✅ Admin removed: {user_id}")
             return True
         except Exception as e:
@@ -57,6 +64,8 @@ class AdminDatabase:
     @staticmethod
     async def get_all_admins() -> List[Dict[str, Any]]:
         """Get all admins"""
+        if db.admins.loaded:
+            return sorted(db.admins.get_all(), key=lambda admin: admin['added_at'] or datetime.min, reverse=True)
         try:
             query = """
                 SELECT user_id, name, role, added_at, active
@@ -80,7 +89,7 @@ class AdminDatabase:
                 SELECT 
                     COUNT(*) as total,
                     COUNT(CASE WHEN last_active > NOW() - INTERVAL '24 hours' THEN 1 END) as active,
-                    COUNT(CASE WHEN banned = true THEN 1 END) as banned,
+                    COUNT(CASE WHEN is_banned = true THEN 1 END) as banned,
                     COUNT(CASE WHEN created_at > NOW() - INTERVAL '1 day' THEN 1 END) as new_today
                 FROM users
             """
@@ -95,7 +104,7 @@ class AdminDatabase:
         """Search users by username, name or ID"""
         try:
             query = """
-                SELECT user_id, username, first_name, credits, banned, created_at
+                SELECT user_id, username, first_name, credits, is_banned AS banned, created_at
                 FROM users
                 WHERE 
                     CAST(user_id AS TEXT) LIKE $1 OR
@@ -112,31 +121,19 @@ class AdminDatabase:
     
     @staticmethod
     async def ban_user(user_id: int, reason: str = None, banned_by: int = None) -> bool:
-        """Ban a user"""
-        try:
-            query = """
-                UPDATE users 
-                SET banned = true, ban_reason = $2, banned_at = $3, banned_by = $4
-                WHERE user_id = $1
-            """
-            await db.execute(query, user_id, reason, datetime.now(), banned_by)
-            logger.info(f"✅ User banned: {user_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Error banning user: {e}")
+        """Ban a user (the users table has no reason/by columns, they are logged)"""
+        if not await db.set_user_banned(user_id, True):
             return False
+        logger.info(f"✅ User banned: {user_id} by {banned_by} ({reason or 'no reason'})")
+        return True
     
     @staticmethod
     async def unban_user(user_id: int) -> bool:
         """Unban a user"""
-        try:
-            query = "UPDATE users SET banned = false, ban_reason = NULL WHERE user_id = $1"
-            await db.execute(query, user_id)
-            logger.info(f"✅ User unbanned: {user_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Error unbanning user: {e}")
+        if not await db.set_user_banned(user_id, False):
             return False
+        logger.info(f"✅ User unbanned: {user_id}")
+        return True
     
     @staticmethod
     async def adjust_credits(user_id: int, amount: int, reason: str = None) -> bool:
@@ -148,14 +145,15 @@ class AdminDatabase:
                 WHERE user_id = $1
                 RETURNING credits
             """
-            new_credits = await db.fetchval(query, user_id, amount)
-            
             # Log transaction
             log_query = """
-                INSERT INTO credit_transactions (user_id, amount, reason, created_at)
+                INSERT INTO credits_history (user_id, amount, type, reason)
                 VALUES ($1, $2, $3, $4)
             """
-            await db.execute(log_query, user_id, amount, reason, datetime.now())
+            
+            async with db.transaction():
+                new_credits = await db.fetchval(query, user_id, amount)
+                await db.execute(log_query, user_id, amount, 'add' if amount >= 0 else 'deduct', reason)
             
             logger.info(f"✅ Credits adjusted for {user_id}: {amount} (new: {new_credits})")
             return True
@@ -168,7 +166,7 @@ class AdminDatabase:
         """Get all users with pagination"""
         try:
             query = """
-                SELECT user_id, username, first_name, credits, banned, created_at, last_active
+                SELECT user_id, username, first_name, credits, is_banned AS banned, created_at, last_active
                 FROM users
                 ORDER BY created_at DESC
                 LIMIT $1 OFFSET $2
@@ -206,6 +204,7 @@ class AdminDatabase:
                 ON CONFLICT (channel_id) DO UPDATE SET active = true
             """
             await db.execute(query, channel_id, title, username, datetime.now())
+            await db.invalidation.publish('force_join_channels', channel_id)
             logger.info(f"✅ Force join channel added: {username}")
             return True
         except Exception as e:
@@ -218,6 +217,7 @@ class AdminDatabase:
         try:
             query = "DELETE FROM force_join_channels WHERE channel_id = $1"
             await db.execute(query, channel_id)
+            await db.invalidation.publish('force_join_channels', channel_id)
             logger.info(f"✅ Force join channel removed: {channel_id}")
             return True
         except Exception as e:
@@ -230,6 +230,7 @@ class AdminDatabase:
         try:
             query = "UPDATE force_join_channels SET active = $2 WHERE channel_id = $1"
             await db.execute(query, channel_id, active)
+            await db.invalidation.publish('force_join_channels', channel_id)
             return True
         except Exception as e:
             logger.error(f"Error toggling force join status: {e}")
@@ -399,6 +400,7 @@ class AdminDatabase:
                 SET content = $2, updated_by = $3, updated_at = $4
             """
             await db.execute(query, content_key, content, updated_by, datetime.now())
+            await db.invalidation.publish('content', content_key)
             logger.info(f"✅ Content updated: {content_key}")
             return True
         except Exception as e:
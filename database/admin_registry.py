@@ -0,0 +1,85 @@
+# 👑 Admin Registry - In-memory active admins with roles and permissions
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Roles that implicitly hold every permission
+SUPER_ROLES = ('owner', 'superadmin')
+
+
+class AdminRegistry:
+    """
+    Active admins held in memory, loaded at startup and kept write-through
+    
+    Every admin gate (dashboard callbacks, force join bypass, auth flow)
+    reads from here, so gating costs no database round trip. Until load()
+    has completed, `loaded` is False and callers must query the database.
+    """
+    
+    def __init__(self):
+        self._admins: Dict[int, Dict] = {}
+        self._generation = 0
+        self.loaded = False
+    
+    @staticmethod
+    def _parse(row) -> Dict:
+        admin = dict(row)
+        permissions = admin.get('permissions')
+        if isinstance(permissions, str):
+            try:
+                permissions = json.loads(permissions)
+            except json.JSONDecodeError:
+                logger.warning(f"⚠️ Invalid permissions JSON for admin {admin.get('user_id')}")
+                permissions = {}
+        admin['permissions'] = permissions if isinstance(permissions, dict) else {}
+        return admin
+    
+    async def load(self, connection):
+        """Rebuild the registry from the admins table"""
+        while True:
+            generation = self._generation
+            rows = await connection.fetch("SELECT * FROM admins WHERE active = TRUE")
+            # A write landed while loading: the snapshot may predate it
+            if generation == self._generation:
+                break
+        
+        self._admins = {row['user_id']: self._parse(row) for row in rows}
+        self.loaded = True
+        logger.info(f"✅ Admin registry loaded: {len(self._admins)} admins")
+    
+    def is_admin(self, user_id: int) -> bool:
+        """Check if user is an active admin"""
+        return user_id in self._admins
+    
+    def get(self, user_id: int) -> Optional[Dict]:
+        """Active admin record (role, level, parsed permissions) or None"""
+        admin = self._admins.get(user_id)
+        return dict(admin) if admin else None
+    
+    def get_all(self) -> List[Dict]:
+        """All active admins"""
+        return [dict(admin) for admin in self._admins.values()]
+    
+    def has_permission(self, user_id: int, permission: str) -> bool:
+        """Check a permission flag; owner/superadmin roles hold all of them"""
+        admin = self._admins.get(user_id)
+        if not admin:
+            return False
+        return admin.get('role') in SUPER_ROLES or bool(admin['permissions'].get(permission))
+    
+    def set(self, row):
+        """Write-through after an admins row changed (inactive rows are dropped)"""
+        self._generation += 1
+        admin = self._parse(row)
+        if admin.get('active', True):
+            self._admins[admin['user_id']] = admin
+        else:
+            self._admins.pop(admin['user_id'], None)
+    
+    def discard(self, user_id: int):
+        """Write-through after an admin was removed or deactivated"""
+        self._generation += 1
+        self._admins.pop(user_id, None)
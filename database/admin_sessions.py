@@ -0,0 +1,151 @@
+# 🔐 Admin Session Store - Shared, expiring admin sessions in Postgres
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdminSessionStore:
+    """
+    Admin sessions shared by every bot instance
+    
+    Sessions live in the UNLOGGED admin_sessions table (cheap writes; a
+    database crash only logs admins out) and survive bot restarts. Each
+    instance keeps a read cache of expiry times, so a dashboard click
+    normally costs no round trip:
+    
+    - TTL is sliding: activity pushes expiry out again, written to the
+      table at most once per EXTEND_INTERVAL
+    - a cached expiry in the past is re-read, since another instance may
+      have extended the session
+    - login/logout publish 'admin_sessions' to evict other caches
+    - a background sweep deletes expired rows
+    """
+    
+    EXTEND_INTERVAL = timedelta(minutes=1)
+    SWEEP_INTERVAL = 300  # seconds between expiry sweeps
+    
+    def __init__(self, database, ttl: timedelta):
+        self._db = database
+        self.ttl = ttl
+        # user_id -> expires_at (None = known logged out)
+        self._cache: Dict[int, Optional[datetime]] = {}
+        self._task: Optional[asyncio.Task] = None
+        database.invalidation.subscribe('admin_sessions', self._evict, self._evict)
+    
+    async def create(self, user_id: int) -> bool:
+        """Start (or restart) a session after successful authentication"""
+        try:
+            expires_at = await self._db.fetchval(
+                """INSERT INTO admin_sessions (user_id, expires_at)
+                   VALUES ($1, NOW() + $2::INTERVAL)
+                   ON CONFLICT (user_id) DO UPDATE SET created_at = NOW(), expires_at = EXCLUDED.expires_at
+                   RETURNING expires_at""",
+                user_id, self.ttl
+            )
+            await self._db.invalidation.publish('admin_sessions', user_id, local=False)
+            self._cache[user_id] = expires_at
+            return True
+        except Exception as e:
+            logger.error(f"Error creating admin session: {e}")
+            return False
+    
+    async def is_active(self, user_id: int) -> bool:
+        """Check a session and slide its expiry forward"""
+        now = datetime.now(timezone.utc)
+        
+        if user_id in self._cache:
+            expires_at = self._cache[user_id]
+            if expires_at is None:
+                return False
+            if expires_at <= now:
+                # Possibly extended elsewhere, re-read below
+                expires_at = await self._load(user_id)
+        else:
+            expires_at = await self._load(user_id)
+        
+        if expires_at is None or expires_at <= now:
+            return False
+        
+        if expires_at - now < self.ttl - self.EXTEND_INTERVAL:
+            await self._extend(user_id)
+        return True
+    
+    async def revoke(self, user_id: int):
+        """End a session on every instance"""
+        try:
+            await self._db.execute("DELETE FROM admin_sessions WHERE user_id = $1", user_id)
+            await self._db.invalidation.publish('admin_sessions', user_id, local=False)
+            self._cache[user_id] = None
+        except Exception as e:
+            logger.error(f"Error revoking admin session: {e}")
+    
+    async def _load(self, user_id: int) -> Optional[datetime]:
+        try:
+            expires_at = await self._db.fetchval(
+                "SELECT expires_at FROM admin_sessions WHERE user_id = $1 AND expires_at > NOW()",
+                user_id
+            )
+        except Exception as e:
+            logger.error(f"Error loading admin session: {e}")
+            return None
+        self._cache[user_id] = expires_at
+        return expires_at
+    
+    async def _extend(self, user_id: int):
+        try:
+            expires_at = await self._db.fetchval(
+                """UPDATE admin_sessions SET expires_at = NOW() + $2::INTERVAL
+                   WHERE user_id = $1 AND expires_at > NOW()
+                   RETURNING expires_at""",
+                user_id, self.ttl
+            )
+            self._cache[user_id] = expires_at
+        except Exception as e:
+            logger.error(f"Error extending admin session: {e}")
+    
+    async def _evict(self, user_id: Optional[str] = None):
+        """Invalidation subscriber: drop one cached session (or all)"""
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(int(user_id), None)
+    
+    # ==================== EXPIRY SWEEP ====================
+    
+    async def start(self):
+        """Start the background expiry sweep"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+    
+    async def stop(self):
+        """Stop the expiry sweep"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def sweep(self) -> int:
+        """Delete expired sessions, returns how many were removed"""
+        now = datetime.now(timezone.utc)
+        for user_id in [uid for uid, expires_at in self._cache.items() if expires_at and expires_at <= now]:
+            del self._cache[user_id]
+        
+        rows = await self._db.fetch("DELETE FROM admin_sessions WHERE expires_at <= NOW() RETURNING user_id")
+        if rows:
+            logger.info(f"⏱️ Expired {len(rows)} admin sessions")
+        return len(rows)
+    
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.SWEEP_INTERVAL)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping admin sessions: {e}")
@@ -1,19 +1,67 @@
 # 🛠️ Database Connection Pool & Query Manager
 
+import asyncio
 import asyncpg
 import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from typing import Optional, List, Dict
-from config import DatabaseConfig
+from config import DatabaseConfig, AppConfig
+from database.user_flags import UserFlagsIndex
+from database.admin_registry import AdminRegistry
+from database.admin_sessions import AdminSessionStore
+from database.invalidation import InvalidationBus
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
 
+class _UnitOfWork:
+    """One pooled connection pinned to an update or transaction block"""
+    
+    __slots__ = ('pool', 'connection', 'task', 'transactions')
+    
+    def __init__(self, pool: asyncpg.Pool):
+        self.pool = pool
+        self.connection: Optional[asyncpg.Connection] = None
+        self.transactions = 0
+        # Tasks spawned inside the block inherit the context var but must not
+        # share the connection (asyncpg allows one operation at a time)
+        self.task = asyncio.current_task()
+    
+    async def acquire(self) -> asyncpg.Connection:
+        """Acquire lazily, so updates that never touch the DB never wait on the pool"""
+        if self.connection is None:
+            self.connection = await self.pool.acquire()
+        return self.connection
+    
+    async def release(self):
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            await self.pool.release(connection)
+
+
+_unit_of_work: ContextVar[Optional[_UnitOfWork]] = ContextVar('db_unit_of_work', default=None)
+
+
 class Database:
     """PostgreSQL database connection manager with connection pooling"""
     
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
+        self.user_flags = UserFlagsIndex()
+        self.admins = AdminRegistry()
+        self.invalidation = InvalidationBus(self)
+        self.invalidation.subscribe('users', self._refresh_user_flags, self.load_user_flags)
+        self.invalidation.subscribe('admins', self._refresh_admin, self.load_admins)
+        self.admin_sessions = AdminSessionStore(self, timedelta(minutes=AppConfig.ADMIN_SESSION_TIMEOUT))
+        
+        # Force join channel list, reloaded after every change (version bump)
+        self._force_join_channels: Optional[List[Dict]] = None
+        self.force_join_version = 0
+        self.invalidation.subscribe(
+            'force_join_channels', self._bump_force_join_version, self._bump_force_join_version
+        )
     
     async def connect(self):
         """Initialize database connection pool"""
@@ -26,6 +74,8 @@ class Database:
             )
             logger.info("✅ Database connected")
             await self.create_tables()
+            await self.load_user_flags()
+            await self.load_admins()
         except Exception as e:
             logger.error(f"❌ Database connection failed: {e}")
             raise
@@ -36,24 +86,118 @@ class Database:
             await self.pool.close()
             logger.info("✅ Database disconnected")
     
+    # ==================== CONNECTION PINNING ====================
+    
+    def _require_pool(self) -> asyncpg.Pool:
+        if self.pool is None:
+            raise RuntimeError("Database pool is not initialized, call db.connect() first")
+        return self.pool
+    
+    def _current_unit(self) -> Optional[_UnitOfWork]:
+        """Unit of work owned by the running task, if any"""
+        unit = _unit_of_work.get()
+        if unit is None or unit.pool is not self.pool or unit.task is not asyncio.current_task():
+            return None
+        return unit
+    
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Yield the connection pinned to the current unit of work,
+        or a short-lived pooled connection when nothing is pinned
+        """
+        unit = self._current_unit()
+        if unit is not None:
+            yield await unit.acquire()
+        else:
+            async with self._require_pool().acquire() as connection:
+                yield connection
+    
+    @asynccontextmanager
+    async def unit_of_work(self):
+        """
+        Pin one pooled connection for the enclosed block
+        
+        Every helper called inside the block (directly or through models)
+        reuses the same connection instead of acquiring its own. The
+        connection is acquired on first use and released on exit.
+        Nested blocks join the outer unit.
+        """
+        if self.pool is None or self._current_unit() is not None:
+            yield
+            return
+        
+        unit = _UnitOfWork(self.pool)
+        token = _unit_of_work.set(unit)
+        try:
+            yield
+        finally:
+            _unit_of_work.reset(token)
+            await unit.release()
+    
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run the enclosed helpers atomically on one connection
+        
+        Usage:
+            async with db.transaction():
+                await db.execute(...)
+                await Order.mark_completed(...)
+        
+        Nested blocks become savepoints.
+        """
+        self._require_pool()
+        async with self.unit_of_work():
+            unit = self._current_unit()
+            connection = await unit.acquire()
+            unit.transactions += 1
+            try:
+                async with connection.transaction():
+                    yield connection
+            finally:
+                unit.transactions -= 1
+    
+    @asynccontextmanager
+    async def released(self):
+        """
+        Give the pinned connection back to the pool around a block that
+        mostly waits on something else (AI calls, Telegram uploads)
+        
+        Queries inside the block use short-lived pooled connections; the
+        unit re-acquires lazily on its next query after the block. Inside
+        a transaction the connection stays pinned.
+        """
+        unit = self._current_unit()
+        if unit is None or unit.transactions:
+            yield
+            return
+        
+        await unit.release()
+        token = _unit_of_work.set(None)
+        try:
+            yield
+        finally:
+            _unit_of_work.reset(token)
+    
     async def execute(self, query: str, *args):
         """Execute a query (INSERT, UPDATE, DELETE)"""
-        async with self.pool.acquire() as connection:
+        async with self.connection() as connection:
             return await connection.execute(query, *args)
     
     async def fetch(self, query: str, *args):
         """Fetch multiple rows"""
-        async with self.pool.acquire() as connection:
+        async with self.connection() as connection:
             return await connection.fetch(query, *args)
     
     async def fetchrow(self, query: str, *args):
         """Fetch single row"""
-        async with self.pool.acquire() as connection:
+        async with self.connection() as connection:
             return await connection.fetchrow(query, *args)
     
     async def fetchval(self, query: str, *args):
         """Fetch single value"""
-        async with self.pool.acquire() as connection:
+        async with self.connection() as connection:
             return await connection.fetchval(query, *args)
     
     async def create_tables(self):
@@ -102,6 +246,17 @@ class Database:
                 )
                 """,
                 
+                # Channel memberships table (fed by chat_member updates)
+                """
+                CREATE TABLE IF NOT EXISTS channel_memberships (
+                    user_id BIGINT,
+                    channel_id BIGINT,
+                    status VARCHAR(20),
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    PRIMARY KEY (user_id, channel_id)
+                )
+                """,
+                
                 # Broadcast history table
                 """
                 CREATE TABLE IF NOT EXISTS broadcast_history (
@@ -136,6 +291,90 @@ class Database:
                     value TEXT,
                     updated_at TIMESTAMP DEFAULT NOW()
                 )
+                """,
+                
+                # AI response cache (services/ai_cache.py)
+                """
+                CREATE TABLE IF NOT EXISTS ai_response_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    expires_at TIMESTAMPTZ NOT NULL
+                )
+                """,
+                
+                # Bulk caption refresh jobs (services/caption_job.py), one checkpoint row per job
+                """
+                CREATE TABLE IF NOT EXISTS caption_jobs (
+                    id SERIAL PRIMARY KEY,
+                    status VARCHAR(20) NOT NULL DEFAULT 'running',
+                    total INTEGER NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    last_course_id INTEGER NOT NULL DEFAULT 0,
+                    started_by BIGINT,
+                    report_chat_id BIGINT,
+                    report_message_id BIGINT,
+                    created_at TIMESTAMP DEFAULT NOW(),
+                    updated_at TIMESTAMP DEFAULT NOW(),
+                    finished_at TIMESTAMP
+                )
+                """,
+                
+                # Payment proof index (services/proof_index.py): dHash split into 16-bit bands
+                """
+                CREATE TABLE IF NOT EXISTS payment_proof_hashes (
+                    id SERIAL PRIMARY KEY,
+                    dhash BIGINT NOT NULL,
+                    band0 INTEGER NOT NULL,
+                    band1 INTEGER NOT NULL,
+                    band2 INTEGER NOT NULL,
+                    band3 INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    transaction_id TEXT,
+                    user_id BIGINT,
+                    created_at TIMESTAMPTZ DEFAULT NOW()
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_proof_band0 ON payment_proof_hashes (band0)",
+                "CREATE INDEX IF NOT EXISTS idx_proof_band1 ON payment_proof_hashes (band1)",
+                "CREATE INDEX IF NOT EXISTS idx_proof_band2 ON payment_proof_hashes (band2)",
+                "CREATE INDEX IF NOT EXISTS idx_proof_band3 ON payment_proof_hashes (band3)",
+                """
+                CREATE INDEX IF NOT EXISTS idx_proof_transaction
+                    ON payment_proof_hashes (transaction_id) WHERE transaction_id IS NOT NULL
+                """,
+                
+                # AI call accounting (services/ai_usage.py), append-only, written with COPY
+                """
+                CREATE TABLE IF NOT EXISTS ai_usage (
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    method VARCHAR(40) NOT NULL,
+                    model VARCHAR(100) NOT NULL,
+                    latency_ms INTEGER NOT NULL,
+                    tokens_in INTEGER NOT NULL DEFAULT 0,
+                    tokens_out INTEGER NOT NULL DEFAULT 0,
+                    retries SMALLINT NOT NULL DEFAULT 0,
+                    status VARCHAR(12) NOT NULL,
+                    cost DOUBLE PRECISION NOT NULL DEFAULT 0
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_ai_usage_created ON ai_usage USING BRIN (created_at)",
+                
+                # Admin sessions table (UNLOGGED: fast writes, crash only logs admins out)
+                """
+                CREATE UNLOGGED TABLE IF NOT EXISTS admin_sessions (
+                    user_id BIGINT PRIMARY KEY,
+                    created_at TIMESTAMPTZ DEFAULT NOW(),
+                    expires_at TIMESTAMPTZ NOT NULL
+                )
+                """,
+                
+                # Re-verification sweep order (verified users, most recently active first)
+                """
+                CREATE INDEX IF NOT EXISTS idx_users_verified_last_active
+                    ON users (last_active DESC, user_id DESC) WHERE is_verified
                 """
             ]
             
@@ -149,6 +388,39 @@ class Database:
     
     # ==================== USER METHODS ====================
     
+    async def load_user_flags(self):
+        """Load the in-memory verified/banned/premium index"""
+        try:
+            async with self.connection() as connection:
+                await self.user_flags.load(connection)
+        except Exception as e:
+            logger.error(f"Error loading user flags: {e}")
+    
+    async def _refresh_user_flags(self, user_id: Optional[str]):
+        """Invalidation subscriber: re-read one user's flags written elsewhere"""
+        if user_id is None:
+            return await self.load_user_flags()
+        
+        user_id = int(user_id)
+        row = await self.fetchrow(
+            "SELECT is_verified, is_banned, is_premium FROM users WHERE user_id = $1",
+            user_id
+        )
+        self.user_flags.set('verified', user_id, bool(row and row['is_verified']))
+        self.user_flags.set('banned', user_id, bool(row and row['is_banned']))
+        self.user_flags.set('premium', user_id, bool(row and row['is_premium']))
+    
+    async def _refresh_admin(self, user_id: Optional[str]):
+        """Invalidation subscriber: re-read one admin written elsewhere"""
+        if user_id is None:
+            return await self.load_admins()
+        
+        row = await self.fetchrow("SELECT * FROM admins WHERE user_id = $1", int(user_id))
+        if row:
+            self.admins.set(row)
+        else:
+            self.admins.discard(int(user_id))
+    
     async def get_or_create_user(self, user_id: int, username: str = None, first_name: str = None, last_name: str = None) -> Dict:
         """Get user or create if doesn't exist"""
         try:
@@ -198,6 +470,8 @@ class Database:
     
     async def is_user_verified(self, user_id: int) -> bool:
         """Check if user is verified"""
+        if self.user_flags.loaded:
+            return self.user_flags.has('verified', user_id)
         try:
             result = await self.fetchval(
                 "SELECT is_verified FROM users WHERE user_id = $1",
@@ -215,9 +489,92 @@ class Database:
                 "UPDATE users SET is_verified = TRUE WHERE user_id = $1",
                 user_id
             )
+            self.user_flags.set('verified', user_id, True)
+            await self.invalidation.publish('users', user_id, local=False)
         except Exception as e:
             logger.error(f"Error marking user verified: {e}")
     
+    async def mark_user_unverified(self, user_id: int):
+        """Revoke verification (user left a force join channel)"""
+        try:
+            await self.execute(
+                "UPDATE users SET is_verified = FALSE WHERE user_id = $1",
+                user_id
+            )
+            self.user_flags.set('verified', user_id, False)
+            await self.invalidation.publish('users', user_id, local=False)
+        except Exception as e:
+            logger.error(f"Error marking user unverified: {e}")
+    
+    async def unverify_users(self, user_ids: List[int]) -> List[int]:
+        """Revoke verification for many users at once, returns the IDs changed"""
+        if not user_ids:
+            return []
+        try:
+            rows = await self.fetch(
+                """UPDATE users SET is_verified = FALSE 
+                   WHERE user_id = ANY($1::BIGINT[]) AND is_verified 
+                   RETURNING user_id""",
+                user_ids
+            )
+            changed = [row['user_id'] for row in rows]
+            for user_id in changed:
+                self.user_flags.set('verified', user_id, False)
+            await self.invalidation.publish_many('users', changed, local=False)
+            return changed
+        except Exception as e:
+            logger.error(f"Error unverifying users: {e}")
+            return []
+    
+    async def get_verified_users_by_activity(self, limit: int, active_days: int,
+                                             after: Optional[tuple] = None) -> List[Dict]:
+        """
+        Page through verified users, most recently active first
+        
+        Args:
+            limit: Page size
+            active_days: Only users active within this many days
+            after: (last_active, user_id) of the previous page's last row
+        """
+        try:
+            if after is None:
+                rows = await self.fetch(
+                    """SELECT user_id, last_active FROM users 
+                       WHERE is_verified AND last_active > NOW() - make_interval(days => $1) 
+                       ORDER BY last_active DESC, user_id DESC LIMIT $2""",
+                    active_days, limit
+                )
+            else:
+                rows = await self.fetch(
+                    """SELECT user_id, last_active FROM users 
+                       WHERE is_verified AND last_active > NOW() - make_interval(days => $1) 
+                         AND (last_active, user_id) < ($3, $4) 
+                       ORDER BY last_active DESC, user_id DESC LIMIT $2""",
+                    active_days, limit, after[0], after[1]
+                )
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting verified users: {e}")
+            return []
+    
+    def is_user_banned(self, user_id: int) -> bool:
+        """Check if user is banned (memory only - used at ingress)"""
+        return self.user_flags.has('banned', user_id)
+    
+    async def set_user_banned(self, user_id: int, banned: bool = True) -> bool:
+        """Ban or unban a user, and tell the other instances"""
+        try:
+            await self.execute(
+                "UPDATE users SET is_banned = $2 WHERE user_id = $1",
+                user_id, banned
+            )
+            self.user_flags.set('banned', user_id, banned)
+            await self.invalidation.publish('users', user_id, local=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error setting user ban: {e}")
+            return False
+    
     async def get_user_stats(self) -> Dict:
         """Get user statistics"""
         try:
@@ -244,8 +601,18 @@ class Database:
     
     # ==================== ADMIN METHODS ====================
     
+    async def load_admins(self):
+        """Load the in-memory admin registry"""
+        try:
+            async with self.connection() as connection:
+                await self.admins.load(connection)
+        except Exception as e:
+            logger.error(f"Error loading admin registry: {e}")
+    
     async def is_admin(self, user_id: int) -> bool:
         """Check if user is admin"""
+        if self.admins.loaded:
+            return self.admins.is_admin(user_id)
         try:
             result = await self.fetchval(
                 "SELECT COUNT(*) FROM admins WHERE user_id = $1 AND active = TRUE",
@@ -257,7 +624,9 @@ class Database:
             return False
     
     async def get_admin(self, user_id: int) -> Optional[Dict]:
-        """Get admin by user ID"""
+        """Get admin by user ID (active admins only once the registry is loaded)"""
+        if self.admins.loaded:
+            return self.admins.get(user_id)
         try:
             row = await self.fetchrow(
                 "SELECT * FROM admins WHERE user_id = $1",
@@ -280,12 +649,15 @@ class Database:
     async def add_admin(self, user_id: int, name: str, role: str = 'admin', added_by: int = None):
         """Add new admin"""
         try:
-            await self.execute(
+            row = await self.fetchrow(
                 """INSERT INTO admins (user_id, name, role, level, added_by) 
                    VALUES ($1, $2, $3, $3, $4) 
-                   ON CONFLICT (user_id) DO UPDATE SET role = $3, level = $3""",
+                   ON CONFLICT (user_id) DO UPDATE SET role = $3, level = $3
+                   RETURNING *""",
                 user_id, name, role, added_by
             )
+            self.admins.set(row)
+            await self.invalidation.publish('admins', user_id, local=False)
         except Exception as e:
             logger.error(f"Error adding admin: {e}")
     
@@ -293,6 +665,8 @@ class Database:
         """Remove admin"""
         try:
             await self.execute("DELETE FROM admins WHERE user_id = $1", user_id)
+            self.admins.discard(user_id)
+            await self.invalidation.publish('admins', user_id, local=False)
         except Exception as e:
             logger.error(f"Error removing admin: {e}")
     
@@ -324,15 +698,46 @@ class Database:
     # ==================== FORCE JOIN METHODS ====================
     
     async def get_force_join_channels(self) -> List[Dict]:
-        """Get all active force join channels"""
+        """
+        Get all active force join channels
+        
+        Served from memory; add/remove/toggle publish 'force_join_channels',
+        which bumps force_join_version and drops the cached list.
+        """
+        if self._force_join_channels is not None:
+            return list(self._force_join_channels)
+        
+        version = self.force_join_version
         try:
             rows = await self.fetch(
                 "SELECT * FROM force_join_channels WHERE active = TRUE ORDER BY added_at DESC"
             )
-            return [dict(row) for row in rows]
+            channels = [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Error getting force join channels: {e}")
             return []
+        
+        # Changed while loading: don't cache a stale list
+        if version == self.force_join_version:
+            self._force_join_channels = channels
+        return list(channels)
+    
+    async def _bump_force_join_version(self, channel_id: Optional[str] = None):
+        """Invalidation subscriber: the channel list changed"""
+        self.force_join_version += 1
+        self._force_join_channels = None
+    
+    async def get_force_join_channel(self, channel_id: int) -> Optional[Dict]:
+        """Get one force join channel (active or not)"""
+        try:
+            row = await self.fetchrow(
+                "SELECT * FROM force_join_channels WHERE channel_id = $1",
+                channel_id
+            )
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error getting force join channel: {e}")
+            return None
     
     async def add_force_join_channel(self, channel_id: int, username: str, title: str, channel_type: str = 'channel'):
         """Add force join channel"""
@@ -343,6 +748,7 @@ class Database:
                    ON CONFLICT (channel_id) DO UPDATE SET username = $2, title = $3, type = $4""",
                 channel_id, username, title, channel_type
             )
+            await self.invalidation.publish('force_join_channels', channel_id)
         except Exception as e:
             logger.error(f"Error adding force join channel: {e}")
     
@@ -353,9 +759,51 @@ class Database:
                 "DELETE FROM force_join_channels WHERE channel_id = $1",
                 channel_id
             )
+            await self.execute(
+                "DELETE FROM channel_memberships WHERE channel_id = $1",
+                channel_id
+            )
+            await self.invalidation.publish('force_join_channels', channel_id)
         except Exception as e:
             logger.error(f"Error removing force join channel: {e}")
     
+    async def get_channel_memberships(self, user_id: int, channel_ids: List[int],
+                                      max_age: int) -> Dict[int, str]:
+        """Recorded member statuses of a user (channel_id -> status), at most max_age seconds old"""
+        try:
+            rows = await self.fetch(
+                """SELECT channel_id, status FROM channel_memberships 
+                   WHERE user_id = $1 AND channel_id = ANY($2::BIGINT[])
+                     AND updated_at > NOW() - make_interval(secs => $3)""",
+                user_id, channel_ids, max_age
+            )
+            return {row['channel_id']: row['status'] for row in rows}
+        except Exception as e:
+            logger.error(f"Error getting channel memberships: {e}")
+            return {}
+    
+    async def set_channel_membership(self, user_id: int, channel_id: int, status: str,
+                                     observed_at: Optional[datetime] = None):
+        """
+        Record a user's member status in a channel
+        
+        Args:
+            observed_at: When Telegram reported the status (update date),
+                None for now. An older observation never overwrites a newer one,
+                so out-of-order updates can't pin a stale status.
+        """
+        try:
+            await self.execute(
+                """INSERT INTO channel_memberships (user_id, channel_id, status, updated_at) 
+                   VALUES ($1, $2, $3, COALESCE($4::TIMESTAMPTZ, NOW())) 
+                   ON CONFLICT (user_id, channel_id) DO UPDATE
+                   SET status = EXCLUDED.status, updated_at = EXCLUDED.updated_at
+                   WHERE channel_memberships.updated_at <= EXCLUDED.updated_at""",
+                user_id, channel_id, status, observed_at
+            )
+        except Exception as e:
+            logger.error(f"Error setting channel membership: {e}")
+    
     # ==================== BROADCAST METHODS ====================
     
     async def get_broadcast_stats(self) -> Dict:
@@ -437,30 +885,32 @@ class Database:
     async def add_credits(self, user_id: int, amount: int, reason: str = None, added_by: int = None):
         """Add credits to user"""
         try:
-            await self.execute(
-                "UPDATE users SET credits = credits + $1 WHERE user_id = $2",
-                amount, user_id
-            )
-            await self.execute(
-                """INSERT INTO credits_history (user_id, amount, type, reason, created_by) 
-                   VALUES ($1, $2, 'add', $3, $4)""",
-                user_id, amount, reason, added_by
-            )
+            async with self.transaction():
+                await self.execute(
+                    "UPDATE users SET credits = credits + $1 WHERE user_id = $2",
+                    amount, user_id
+                )
+                await self.execute(
+                    """INSERT INTO credits_history (user_id, amount, type, reason, created_by) 
+                       VALUES ($1, $2, 'add', $3, $4)""",
+                    user_id, amount, reason, added_by
+                )
         except Exception as e:
             logger.error(f"Error adding credits: {e}")
     
     async def deduct_credits(self, user_id: int, amount: int, reason: str = None, deducted_by: int = None):
         """Deduct credits from user"""
         try:
-            await self.execute(
-                "UPDATE users SET credits = GREATEST(credits - $1, 0) WHERE user_id = $2",
-                amount, user_id
-            )
-            await self.execute(
-                """INSERT INTO credits_history (user_id, amount, type, reason, created_by) 
-                   VALUES ($1, $2, 'deduct', $3, $4)""",
-                user_id, -amount, reason, deducted_by
-            )
+            async with self.transaction():
+                await self.execute(
+                    "UPDATE users SET credits = GREATEST(credits - $1, 0) WHERE user_id = $2",
+                    amount, user_id
+                )
+                await self.execute(
+                    """INSERT INTO credits_history (user_id, amount, type, reason, created_by) 
+                       VALUES ($1, $2, 'deduct', $3, $4)""",
+                    user_id, -amount, reason, deducted_by
+                )
         except Exception as e:
             logger.error(f"Error deducting credits: {e}")
     
@@ -531,6 +981,7 @@ class Database:
                    ON CONFLICT (key) DO UPDATE SET value = $2, updated_at = NOW()""",
                 key, value
             )
+            await self.invalidation.publish('content', key)
         except Exception as e:
             logger.error(f"Error setting custom content: {e}")
 
@@ -0,0 +1,200 @@
+# 📡 Cache Invalidation Bus - Postgres LISTEN/NOTIFY across bot instances
+
+import asyncio
+import asyncpg
+import json
+import logging
+import uuid
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# Single NOTIFY channel, the topic travels in the payload
+CHANNEL = 'botavik_invalidate'
+
+EvictCallback = Callable[[Optional[str]], Awaitable[None]]
+ResyncCallback = Callable[[], Awaitable[None]]
+
+
+class InvalidationBus:
+    """
+    Cross-instance cache invalidation over LISTEN/NOTIFY
+    
+    Write paths call publish(topic, key). Every other bot instance (and, by
+    default, this one) runs the evict callbacks subscribed to that topic.
+    When published inside db.transaction() the notification is delivered
+    on commit only.
+    
+    Listening uses a dedicated connection outside the pool. If it drops,
+    the bus reconnects with backoff and runs every resync callback, since
+    notifications sent while disconnected are lost.
+    """
+    
+    HEALTH_CHECK_INTERVAL = 30  # seconds between liveness pings
+    HEALTH_CHECK_TIMEOUT = 10   # a ping slower than this means the connection is gone
+    MAX_BACKOFF = 60
+    MAX_KEYS_PER_NOTIFY = 300   # keeps a batched payload under Postgres' 8000 byte limit
+    
+    def __init__(self, database):
+        self._db = database
+        self.instance_id = uuid.uuid4().hex[:12]
+        self._evict: Dict[str, List[EvictCallback]] = defaultdict(list)
+        self._resync: List[ResyncCallback] = []
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lost = asyncio.Event()
+        self._dispatching: Set[asyncio.Task] = set()
+    
+    def subscribe(self, topic: str, on_evict: EvictCallback, on_resync: ResyncCallback = None):
+        """
+        Register a cache with the bus
+        
+        Args:
+            topic: Topic name (e.g. 'admins', 'courses')
+            on_evict: Called with the published key (None = whole topic)
+            on_resync: Called after reconnecting, must reload everything
+        """
+        self._evict[topic].append(on_evict)
+        if on_resync and on_resync not in self._resync:
+            self._resync.append(on_resync)
+    
+    async def publish(self, topic: str, key=None, local: bool = True):
+        """
+        Invalidate a key on all instances
+        
+        Args:
+            topic: Topic name
+            key: Key to evict, None evicts the whole topic
+            local: Also evict on this instance (skip for write-through caches)
+        """
+        key = None if key is None else str(key)
+        
+        if local:
+            await self._dispatch(topic, key)
+        
+        payload = json.dumps({'t': topic, 'k': key, 'o': self.instance_id})
+        try:
+            await self._db.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+        except Exception as e:
+            logger.error(f"Error publishing invalidation {topic}/{key}: {e}")
+    
+    async def publish_many(self, topic: str, keys: List, local: bool = True):
+        """
+        Invalidate many keys of a topic with one NOTIFY per MAX_KEYS_PER_NOTIFY
+        
+        Args:
+            topic: Topic name
+            keys: Keys to evict
+            local: Also evict on this instance (skip for write-through caches)
+        """
+        keys = [str(key) for key in keys]
+        
+        if local:
+            for key in keys:
+                await self._dispatch(topic, key)
+        
+        for start in range(0, len(keys), self.MAX_KEYS_PER_NOTIFY):
+            batch = keys[start:start + self.MAX_KEYS_PER_NOTIFY]
+            payload = json.dumps({'t': topic, 'ks': batch, 'o': self.instance_id})
+            try:
+                await self._db.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+            except Exception as e:
+                logger.error(f"Error publishing invalidation {topic} ({len(batch)} keys): {e}")
+    
+    async def start(self):
+        """Start the listener task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop listening and close the dedicated connection"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _dispatch_many(self, topic: str, keys: List[Optional[str]]):
+        for key in keys:
+            await self._dispatch(topic, key)
+    
+    async def _dispatch(self, topic: str, key: Optional[str]):
+        for callback in self._evict.get(topic, []):
+            try:
+                await callback(key)
+            except Exception as e:
+                logger.error(f"Error evicting {topic}/{key}: {e}")
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"⚠️ Malformed invalidation payload: {payload[:100]}")
+            return
+        
+        # Our own writes were already evicted locally
+        if message.get('o') == self.instance_id:
+            return
+        
+        keys = message['ks'] if 'ks' in message else [message.get('k')]
+        task = asyncio.create_task(self._dispatch_many(message.get('t'), keys))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+    
+    async def _resync_all(self):
+        logger.info("🔄 Invalidation bus reconnected, resyncing caches")
+        for callback in self._resync:
+            try:
+                await callback()
+            except Exception as e:
+                logger.error(f"Error resyncing cache: {e}")
+    
+    async def _run(self):
+        backoff = 1
+        missed = False
+        
+        while True:
+            try:
+                self._lost.clear()
+                self._connection = await asyncpg.connect(dsn=DatabaseConfig.DATABASE_URL)
+                self._connection.add_termination_listener(lambda connection: self._lost.set())
+                await self._connection.add_listener(CHANNEL, self._on_notify)
+                logger.info("✅ Invalidation bus listening")
+                
+                if missed:
+                    await self._resync_all()
+                backoff = 1
+                
+                # The termination listener misses silent drops, so ping too
+                while not self._lost.is_set():
+                    try:
+                        await asyncio.wait_for(self._lost.wait(), timeout=self.HEALTH_CHECK_INTERVAL)
+                    except asyncio.TimeoutError:
+                        # A silently dropped connection can hang here, bound the ping
+                        await asyncio.wait_for(
+                            self._connection.execute("SELECT 1"), timeout=self.HEALTH_CHECK_TIMEOUT
+                        )
+            
+            except asyncio.CancelledError:
+                await self._close()
+                raise
+            
+            except Exception as e:
+                logger.warning(f"⚠️ Invalidation bus connection lost: {e or 'health check timed out'}")
+            
+            missed = True
+            await self._close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+    
+    async def _close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close(timeout=5)
+            except Exception:
+                connection.terminate()
@@ -0,0 +1,164 @@
+# 🚩 User Flags Index - Compact in-memory verified/banned/premium sets
+
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class CompactBitmap:
+    """
+    Roaring-style integer set
+    
+    Values are split into a high key (value >> 16) and a 16-bit low part.
+    Each key owns a container: a sorted array('H') while small (2 bytes per
+    member, bisect over at most ARRAY_LIMIT entries) and an 8 KB bitmap once
+    dense. Telegram IDs are sparse, so most containers stay tiny arrays and
+    a million members cost a few MB instead of the ~60 MB of a Python set.
+    """
+    
+    ARRAY_LIMIT = 4096  # above this a bitmap (8 KB) is smaller than the array
+    
+    __slots__ = ('_containers', '_size')
+    
+    def __init__(self):
+        self._containers: Dict[int, Union[array, bytearray]] = {}
+        self._size = 0
+    
+    def __contains__(self, value: int) -> bool:
+        container = self._containers.get(value >> 16)
+        if container is None:
+            return False
+        low = value & 0xFFFF
+        if isinstance(container, bytearray):
+            return bool(container[low >> 3] & (1 << (low & 7)))
+        idx = bisect_left(container, low)
+        return idx < len(container) and container[idx] == low
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, value: int) -> bool:
+        """Add value, returns True if it was not present"""
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        
+        if container is None:
+            self._containers[high] = array('H', [low])
+            self._size += 1
+            return True
+        
+        if isinstance(container, bytearray):
+            mask = 1 << (low & 7)
+            if container[low >> 3] & mask:
+                return False
+            container[low >> 3] |= mask
+            self._size += 1
+            return True
+        
+        idx = bisect_left(container, low)
+        if idx < len(container) and container[idx] == low:
+            return False
+        container.insert(idx, low)
+        self._size += 1
+        
+        if len(container) > self.ARRAY_LIMIT:
+            bitmap = bytearray(8192)
+            for member in container:
+                bitmap[member >> 3] |= 1 << (member & 7)
+            self._containers[high] = bitmap
+        return True
+    
+    def discard(self, value: int) -> bool:
+        """Remove value, returns True if it was present"""
+        high, low = value >> 16, value & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            return False
+        
+        if isinstance(container, bytearray):
+            mask = 1 << (low & 7)
+            if not container[low >> 3] & mask:
+                return False
+            container[low >> 3] &= ~mask & 0xFF
+        else:
+            idx = bisect_left(container, low)
+            if idx >= len(container) or container[idx] != low:
+                return False
+            del container[idx]
+            if not container:
+                del self._containers[high]
+        
+        self._size -= 1
+        return True
+
+
+class UserFlagsIndex:
+    """
+    In-process index of user flags, loaded at startup and kept write-through
+    
+    Ingress checks (banned drop, force-join verified skip) become memory
+    lookups; admins live in the AdminRegistry. Until load() has completed, `loaded` is False
+    and callers must fall back to the database.
+    """
+    
+    FLAGS = ('verified', 'banned', 'premium')
+    
+    def __init__(self):
+        self._flags: Dict[str, CompactBitmap] = {flag: CompactBitmap() for flag in self.FLAGS}
+        self._pending: Optional[List[Tuple[str, int, bool]]] = None
+        self.loaded = False
+    
+    async def load(self, connection):
+        """
+        Rebuild the index from the database
+        
+        Streams users through a server-side cursor so a multi-million row
+        table is never materialized. The new sets are swapped in at once.
+        """
+        flags = {flag: CompactBitmap() for flag in self.FLAGS}
+        # Writes that land while the snapshot streams are replayed after the swap
+        self._pending = []
+        
+        try:
+            async with connection.transaction():
+                async for row in connection.cursor(
+                    """SELECT user_id, is_verified, is_banned, is_premium FROM users
+                       WHERE is_verified OR is_banned OR is_premium""",
+                    prefetch=10000
+                ):
+                    if row['is_verified']:
+                        flags['verified'].add(row['user_id'])
+                    if row['is_banned']:
+                        flags['banned'].add(row['user_id'])
+                    if row['is_premium']:
+                        flags['premium'].add(row['user_id'])
+        finally:
+            pending, self._pending = self._pending, None
+        
+        self._flags = flags
+        for flag, user_id, value in pending:
+            self.set(flag, user_id, value)
+        self.loaded = True
+        logger.info(
+            "✅ User flags loaded: " + ", ".join(f"{flag}={len(flags[flag])}" for flag in self.FLAGS)
+        )
+    
+    def has(self, flag: str, user_id: int) -> bool:
+        """Check a flag for a user (O(1) memory lookup)"""
+        return user_id in self._flags[flag]
+    
+    def set(self, flag: str, user_id: int, value: bool = True):
+        """Write-through update after the database row has changed"""
+        if self._pending is not None:
+            self._pending.append((flag, user_id, value))
+        if value:
+            self._flags[flag].add(user_id)
+        else:
+            self._flags[flag].discard(user_id)
+    
+    def count(self, flag: str) -> int:
+        """Number of users with a flag"""
+        return len(self._flags[flag])
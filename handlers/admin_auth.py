@@ -3,15 +3,15 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from datetime import datetime, timedelta
 from database.db import db
+from config import AppConfig
 
 logger = logging.getLogger(__name__)
 
 # Security configuration
 SECURITY_CODE = "122911"
 SECURITY_ANSWER = "avik"  # must be lowercase
-SESSION_TIMEOUT = timedelta(minutes=30)  # Session expires after 30 minutes
+SESSION_TIMEOUT = AppConfig.ADMIN_SESSION_TIMEOUT  # minutes of inactivity before logout (db.admin_sessions)
 
 # Conversation states
 AWAIT_CODE = 1
@@ -184,19 +184,17 @@ class AdminAuth:
             return AWAIT_ANSWER  # Stay in answer verification state
         
         # Answer is correct - Grant access
-        # Store authentication in context
-        context.user_data['authenticated'] = True
-        context.user_data['auth_time'] = datetime.now()
-        context.user_data['auth_user_id'] = user.id
+        # Shared session store: honored by every bot instance and survives restarts
+        await db.admin_sessions.create(user.id)
         
         # Success message
-        success_text = """🎉 **AUTHENTICATION SUCCESSFUL**
+        success_text = f"""🎉 **AUTHENTICATION SUCCESSFUL**
 ═══════════════════════════════════════════════════════════════
 
 ✅ Welcome to the Admin Panel!
 
 🔒 Your session is now active.
-⏱️ Session expires in 30 minutes.
+⏱️ Session expires after {SESSION_TIMEOUT} minutes of inactivity.
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 👑 Click below to access the dashboard."""
@@ -253,6 +251,9 @@ You have cancelled the authentication process.
         """
         Check if user is authenticated and session is valid
         
+        Sessions live in db.admin_sessions, so they hold across bot
+        instances and restarts; each check slides the expiry forward.
+        
         Args:
             user_id: Telegram user ID
             context: Bot context
@@ -260,27 +261,7 @@ You have cancelled the authentication process.
         Returns:
             True if authenticated and session valid, False otherwise
         """
-        # Check if authenticated flag exists
-        if not context.user_data.get('authenticated'):
-            return False
-        
-        # Check if user ID matches
-        if context.user_data.get('auth_user_id') != user_id:
-            return False
-        
-        # Check session timeout
-        auth_time = context.user_data.get('auth_time')
-        if not auth_time:
-            return False
-        
-        # Check if session expired (30 minutes)
-        if datetime.now() - auth_time > SESSION_TIMEOUT:
-            # Session expired - clear authentication
-            context.user_data['authenticated'] = False
-            logger.info(f"⏱️ Session expired for user {user_id}")
-            return False
-        
-        return True
+        return await db.admin_sessions.is_active(user_id)
     
     
     @staticmethod
@@ -291,10 +272,8 @@ You have cancelled the authentication process.
         query = update.callback_query
         user = update.effective_user
         
-        # Clear authentication
-        context.user_data['authenticated'] = False
-        context.user_data['auth_time'] = None
-        context.user_data['auth_user_id'] = None
+        # End the session on every instance
+        await db.admin_sessions.revoke(user.id)
         
         text = """👋 **LOGGED OUT**
 
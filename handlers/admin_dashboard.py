@@ -1,10 +1,16 @@
 # 👑 Premium Admin Dashboard Handler
 
 import logging
+import os
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from database.db import db
 from services.ai_service import ai_service
+from services.ai_scheduler import ai_scheduler
+from services.ai_usage import ai_usage
+from services.model_router import model_router
+from services.export_service import export_service
+from services.caption_job import caption_job_runner, format_progress
 from config import BotConfig, AIConfig
 from handlers.admin_auth import AdminAuth
 from handlers.force_join_manager import ForceJoinManager
@@ -20,6 +26,9 @@ AI_PROMPT = 5
 CONTENT_KEY = 6
 CONTENT_VALUE = 7
 
+# Telegram Bot API upload limit
+EXPORT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
 # Initialize Force Join Manager
 force_join_manager = ForceJoinManager(db)
 
@@ -29,6 +38,11 @@ class AdminDashboard:
     Premium Admin Dashboard Handler with Secure Authentication
     """
     
+    @staticmethod
+    async def check_admin(user_id: int) -> bool:
+        """Check admin status (in-memory admin registry)"""
+        return await db.is_admin(user_id)
+    
     @staticmethod
     async def main_dashboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -94,6 +108,9 @@ class AdminDashboard:
                     InlineKeyboardButton("📚 Docs", callback_data="admin_docs"),
                     InlineKeyboardButton("📝 Logs", callback_data="admin_logs")
                 ],
+                [
+                    InlineKeyboardButton("📤 Export Data", callback_data="admin_export")
+                ],
                 [
                     InlineKeyboardButton("🚪 Logout", callback_data="admin_logout")
                 ]
@@ -478,13 +495,30 @@ async def ai_assistant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     
     # Check if AI is configured
-    ai_status = "✅ Connected" if await ai_service.test_connection() else "❌ Not configured"
+    async with db.released():
+        ai_status = "✅ Connected" if await ai_service.test_connection() else "❌ Not configured"
+    
+    # Request queue
+    queue = ai_scheduler.get_stats()
+    queue_line = (
+        f"{queue['active']}/{queue['max_concurrent']} running, {queue['queue_depth']} queued "
+        f"({queue['queued']['interactive']} interactive, {queue['queued']['normal']} normal, "
+        f"{queue['queued']['bulk']} bulk)"
+    )
+    if queue['backoff_remaining']:
+        queue_line += f"\n⏱️ **Rate limited:** paused {queue['backoff_remaining']}s"
+    
+    # Today's usage
+    today = await ai_usage.get_daily(days=1)
+    usage_line = _format_usage_day(today[0]) if today else "no calls yet"
     
     text = f"""
 🤖 **AI ASSISTANT** (Gemini 2.0 Flash)
 ═══════════════════════════════════════════════════════════════
 
 🔌 **Status:** {ai_status}
+🚦 **Queue:** {queue_line}
+📈 **Today:** {usage_line}
 
 **Generation Tools:**
 • Course Descriptions
@@ -503,6 +537,8 @@ async def ai_assistant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("📌 FAQ Generator", callback_data="ai_faq")],
         [InlineKeyboardButton("📧 Email Template", callback_data="ai_email")],
         [InlineKeyboardButton("💪 Course Ideas", callback_data="ai_ideas")],
+        [InlineKeyboardButton("🔁 Refresh Course Captions", callback_data="ai_captions")],
+        [InlineKeyboardButton("📈 Usage & Latency", callback_data="ai_usage")],
         [InlineKeyboardButton("🔙 Back", callback_data="admin_dashboard")]
     ]
     
@@ -513,3 +549,243 @@ async def ai_assistant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.error(f"❌ Error in AI menu: {e}")
         await query.answer(f"❌ Error: {str(e)[:50]}", show_alert=True)
+
+
+def _format_usage_day(day: dict) -> str:
+    """One line of daily AI usage totals"""
+    p95 = f"{day['p95_ms'] / 1000:.1f}s" if day['p95_ms'] is not None else "n/a"
+    return (
+        f"{day['calls']} calls, {day['errors']} errors, {day['retries']} retries, "
+        f"{day['tokens_in']:,}→{day['tokens_out']:,} tokens, ${day['cost']:.4f}, p95 {p95}"
+    )
+
+
+async def ai_usage_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    AI usage: daily totals, today's p95 latency per method, hedging stats
+    """
+    # Check authentication
+    if not await AdminAuth.check_auth_middleware(update, context):
+        return
+    
+    query = update.callback_query
+    await query.answer()
+    
+    days = await ai_usage.get_daily(days=7)
+    daily = "\n".join(f"{day['day']:%d %b}: {_format_usage_day(day)}" for day in days) or "No AI calls recorded yet."
+    
+    methods = await ai_usage.get_method_latency()
+    latency = "\n".join(
+        f"• {row['method']}: {row['calls']} calls, p95 "
+        + (f"{row['p95_ms'] / 1000:.1f}s" if row['p95_ms'] is not None else "n/a")
+        for row in methods
+    ) or "No calls today."
+    
+    router = model_router.get_stats()
+    hedging = (
+        f"{router['hedges']} hedges, {router['fallbacks']} fallbacks, "
+        f"{router['secondary_wins']} answered by a fallback model"
+    )
+    
+    text = f"""📈 AI USAGE & LATENCY
+═══════════════════════════════════════════════════════════════
+
+📅 Last 7 days:
+{daily}
+
+⏱️ Today by method:
+{latency}
+
+🔀 Since restart: {hedging}"""
+    
+    keyboard = [
+        [InlineKeyboardButton("🔄 Refresh", callback_data="ai_usage")],
+        [InlineKeyboardButton("🔙 Back", callback_data="admin_ai")]
+    ]
+    
+    try:
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    except Exception as e:
+        # "message is not modified" on a refresh without new calls
+        logger.debug(f"AI usage view not updated: {e}")
+
+
+async def caption_job_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Bulk caption refresh: last job status and start/cancel buttons
+    """
+    # Check authentication
+    if not await AdminAuth.check_auth_middleware(update, context):
+        return
+    
+    query = update.callback_query
+    await query.answer()
+    await _show_caption_job(query)
+
+
+async def _show_caption_job(query):
+    """Render the caption refresh menu into the callback's message"""
+    job = await caption_job_runner.get_latest()
+    last_job = format_progress(job) if job else "No caption refresh has run yet."
+    
+    text = f"""🔁 CAPTION REFRESH
+═══════════════════════════════════════════════════════════════
+
+Regenerates the AI caption of many courses in the background
+(oldest courses first, captions that fail keep their old text).
+
+{last_job}"""
+    
+    if caption_job_runner.is_running():
+        keyboard = [
+            [InlineKeyboardButton("🔄 Refresh Status", callback_data="ai_captions")],
+            [InlineKeyboardButton("🛑 Cancel Job", callback_data="ai_captions_cancel")]
+        ]
+    else:
+        keyboard = [
+            [
+                InlineKeyboardButton("50 courses", callback_data="ai_captions_start_50"),
+                InlineKeyboardButton("100 courses", callback_data="ai_captions_start_100")
+            ],
+            [
+                InlineKeyboardButton("500 courses", callback_data="ai_captions_start_500"),
+                InlineKeyboardButton("All courses", callback_data="ai_captions_start_all")
+            ]
+        ]
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data="admin_ai")])
+    
+    await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+
+async def caption_job_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Start or cancel the bulk caption refresh
+    """
+    # Check authentication
+    if not await AdminAuth.check_auth_middleware(update, context):
+        return
+    
+    query = update.callback_query
+    
+    if query.data == 'ai_captions_cancel':
+        cancelled = await caption_job_runner.cancel()
+        await query.answer("🛑 Job cancelled" if cancelled else "No job running")
+        return await _show_caption_job(query)
+    
+    limit = query.data.rsplit('_', 1)[1]
+    
+    # The job edits this message with its progress
+    message = await query.edit_message_text(
+        "🔁 CAPTION REFRESH\n\n⏳ Starting...",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="ai_captions")]])
+    )
+    
+    job = await caption_job_runner.start(
+        context.bot,
+        limit=None if limit == 'all' else int(limit),
+        started_by=update.effective_user.id,
+        chat_id=message.chat_id,
+        message_id=message.message_id
+    )
+    
+    if job:
+        await query.answer("🔁 Caption refresh started")
+        logger.info(f"🔁 Caption refresh #{job['id']} started by {update.effective_user.id}")
+    else:
+        await query.answer("❌ A job is already running or could not start", show_alert=True)
+        await _show_caption_job(query)
+
+
+async def export_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Data export menu (users, orders, credits history)
+    """
+    # Check authentication
+    if not await AdminAuth.check_auth_middleware(update, context):
+        return
+    
+    query = update.callback_query
+    
+    text = """
+📤 **DATA EXPORT**
+═══════════════════════════════════════════════════════════════
+
+**Exports are streamed and gzip-compressed:**
+• Users - profiles, flags, credits
+• Orders - all payment statuses
+• Credits - full credits history
+
+📄 CSV opens in spreadsheets, JSON is one object per line.
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    """
+    
+    keyboard = [
+        [
+            InlineKeyboardButton("👥 Users CSV", callback_data="export_users_csv"),
+            InlineKeyboardButton("👥 Users JSON", callback_data="export_users_json")
+        ],
+        [
+            InlineKeyboardButton("📦 Orders CSV", callback_data="export_orders_csv"),
+            InlineKeyboardButton("📦 Orders JSON", callback_data="export_orders_json")
+        ],
+        [
+            InlineKeyboardButton("💳 Credits CSV", callback_data="export_credits_csv"),
+            InlineKeyboardButton("💳 Credits JSON", callback_data="export_credits_json")
+        ],
+        [InlineKeyboardButton("🔙 Back", callback_data="admin_dashboard")]
+    ]
+    
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+
+
+async def export_data(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Start an export in the background and send the file when ready
+    """
+    # Check authentication
+    if not await AdminAuth.check_auth_middleware(update, context):
+        return
+    
+    query = update.callback_query
+    _, dataset, fmt = query.data.split('_')
+    chat_id = update.effective_chat.id
+    
+    await query.answer("📤 Export started...")
+    await query.edit_message_text(
+        f"📤 **EXPORTING {dataset.upper()}**\n\n⏳ The file will be sent here when ready.",
+        reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back", callback_data="admin_export")]]),
+        parse_mode='Markdown'
+    )
+    
+    # Large exports take a while - don't hold up update processing
+    context.application.create_task(_send_export(context, chat_id, dataset, fmt))
+
+
+async def _send_export(context: ContextTypes.DEFAULT_TYPE, chat_id: int, dataset: str, fmt: str):
+    """Run an export and deliver it as a Telegram document"""
+    result = await export_service.export(dataset, fmt)
+    
+    if not result:
+        await context.bot.send_message(chat_id, f"❌ Export of {dataset} failed. Check logs.")
+        return
+    
+    try:
+        if result['size'] > EXPORT_MAX_UPLOAD_BYTES:
+            await context.bot.send_message(
+                chat_id,
+                f"❌ Export too large for Telegram ({result['size'] // (1024 * 1024)} MB, limit 50 MB)."
+            )
+            return
+        
+        with open(result['path'], 'rb') as document:
+            await context.bot.send_document(
+                chat_id=chat_id,
+                document=document,
+                filename=result['filename'],
+                caption=f"📤 {dataset.capitalize()} export - {result['rows']} rows"
+            )
+    except Exception as e:
+        logger.error(f"❌ Error sending export: {e}")
+    finally:
+        os.unlink(result['path'])
@@ -1,8 +1,12 @@
 # 🤖 AI Caption Generator Handler
 
 import logging
+from typing import Optional
 import aiohttp
 from config import AIConfig
+from services.http_session import http_session
+from services.ai_scheduler import AIScheduler, ai_scheduler
+from services.ai_usage import ai_usage
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +14,24 @@ logger = logging.getLogger(__name__)
 async def generate_caption(title: str, description: str, price: float) -> str:
     """Generate marketing caption using OpenRouter Gemini 2.0 Flash"""
     
-    try:
-        prompt = f"""
+    caption = await request_caption(title, description, price)
+    if caption:
+        return caption
+    
+    # Fallback caption
+    return f"🎓 {title}\n\n{description}\n\nPrice: ₹{price}"
+
+
+async def request_caption(title: str, description: str, price: float,
+                          priority: int = AIScheduler.NORMAL) -> Optional[str]:
+    """
+    Generate a marketing caption, None if the API call failed
+    
+    Args:
+        priority: ai_scheduler priority class (bulk jobs pass BULK)
+    """
+    
+    prompt = f"""
 You are a marketing expert. Create a compelling, short marketing caption (max 200 words) for this course:
 
 Title: {title}
@@ -21,66 +41,79 @@ Price: ₹{price}
 Make it engaging, highlight key benefits, use relevant emojis, and make people want to buy it.
 Keep it concise and impactful.
 """
+    
+    with ai_usage.call(AIConfig.AI_MODEL, 'request_caption') as call:
+        for attempt in range(AIConfig.MAX_RETRIES):
+            call.retries = attempt
+            try:
+                session = await http_session.get()
+                async with ai_scheduler.slot(priority), session.post(
+                    f"{AIConfig.OPENROUTER_API_BASE}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {AIConfig.OPENROUTER_API_KEY}",
+                        "Content-Type": "application/json",
+                    },
+                    json={
+                        "model": AIConfig.AI_MODEL,
+                        "messages": [
+                            {"role": "user", "content": prompt}
+                        ],
+                        "temperature": 0.7,
+                        "max_tokens": 300,
+                        "usage": {"include": True},
+                    },
+                    timeout=aiohttp.ClientTimeout(total=AIConfig.API_TIMEOUT)
+                ) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        caption = data['choices'][0]['message']['content'].strip()
+                        ai_scheduler.succeeded()
+                        call.succeeded(data.get('usage'))
+                        logger.info("✅ Caption generated successfully")
+                        return caption
+                    elif response.status == 429:
+                        ai_scheduler.rate_limited(ai_scheduler.parse_retry_after(response.headers.get('Retry-After')))
+                        call.status = 'rate_limited'
+                        continue
+                    else:
+                        logger.error(f"❌ API Error: {response.status}")
+                        return None
+            
+            except Exception as e:
+                logger.error(f"❌ Error generating caption: {e}")
+                return None
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {AIConfig.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": AIConfig.MODEL_NAME,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 300,
-                },
-                timeout=aiohttp.ClientTimeout(total=AIConfig.TIMEOUT)
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    caption = data['choices'][0]['message']['content'].strip()
-                    logger.info("✅ Caption generated successfully")
-                    return caption
-                else:
-                    logger.error(f"❌ API Error: {response.status}")
-                    return f"🎓 {title}\n\n{description}\n\nPrice: ₹{price}"
-                    
-    except Exception as e:
-        logger.error(f"❌ Error generating caption: {e}")
-        # Fallback caption
-        return f"🎓 {title}\n\n{description}\n\nPrice: ₹{price}"
+        logger.error(f"❌ Caption still rate limited after {AIConfig.MAX_RETRIES} attempts")
+        return None
 
 
 async def get_ai_response(prompt: str) -> str:
     """Get response from AI (generic)"""
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {AIConfig.OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": AIConfig.MODEL_NAME,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": AIConfig.MAX_TOKENS,
-                },
-                timeout=aiohttp.ClientTimeout(total=AIConfig.TIMEOUT)
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data['choices'][0]['message']['content'].strip()
-                else:
-                    return "❌ Error getting AI response"
-                    
+        session = await http_session.get()
+        async with ai_scheduler.slot(), session.post(
+            f"{AIConfig.OPENROUTER_API_BASE}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {AIConfig.OPENROUTER_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": AIConfig.AI_MODEL,
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.7,
+                "max_tokens": AIConfig.MAX_TOKENS,
+            },
+            timeout=aiohttp.ClientTimeout(total=AIConfig.API_TIMEOUT)
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data['choices'][0]['message']['content'].strip()
+            else:
+                return "❌ Error getting AI response"
+    
     except Exception as e:
         logger.error(f"❌ Error: {e}")
         return "❌ Error getting AI response"
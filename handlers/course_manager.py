@@ -7,6 +7,7 @@ from telegram.constants import ParseMode
 from utils.decorators import admin_only, log_command
 from utils.validators import Validator
 from models.course import Course
+from database.db import db
 from handlers.ai_generator import generate_caption
 from config import BotConfig
 
@@ -187,11 +188,12 @@ async def create_and_post_course(update: Update, context: ContextTypes.DEFAULT_T
         )
         
         # Generate AI caption
-        caption = await generate_caption(
-            title=data['course_title'],
-            description=data['course_description'],
-            price=data['course_price']
-        )
+        async with db.released():
+            caption = await generate_caption(
+                title=data['course_title'],
+                description=data['course_description'],
+                price=data['course_price']
+            )
         
         await Course.update_caption(course_id, caption)
         
@@ -4,19 +4,26 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from telegram.error import TelegramError
+from typing import Dict, Tuple
 from database.db import db
+from services.membership_service import membership_service, NOT_MEMBER_STATUSES
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rendered join prompts: (channel list version, channel ids) -> (text template, markup)
+_prompts: Dict[Tuple[int, Tuple[int, ...]], Tuple[str, InlineKeyboardMarkup]] = {}
+
 class ForceJoinChecker:
     """Middleware to check force join requirements"""
     
     @staticmethod
-    async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> tuple[bool, list]:
+    async def check_membership(user_id: int, context: ContextTypes.DEFAULT_TYPE, bypass_cache: bool = False) -> tuple[bool, list]:
         """
         Check if user has joined all required channels
         Returns: (is_member, list_of_not_joined_channels)
+        
+        Membership is served from the TTL cache unless bypass_cache is set
         """
         try:
             # Get all force join channels from database
@@ -25,23 +32,14 @@ class ForceJoinChecker:
             if not required_channels:
                 return True, []
             
-            not_joined = []
-            
-            for channel in required_channels:
-                try:
-                    # Check membership status
-                    member = await context.bot.get_chat_member(
-                        chat_id=channel['channel_id'],
-                        user_id=user_id
-                    )
-                    
-                    # User must be member, administrator, or creator
-                    if member.status not in ['member', 'administrator', 'creator']:
-                        not_joined.append(channel)
-                        
-                except TelegramError as e:
-                    logger.error(f"Error checking membership for channel {channel['channel_id']}: {e}")
-                    not_joined.append(channel)
+            # Check membership for all channels in parallel. User must be
+            # member, administrator, or creator; channels that can't be
+            # checked are skipped (fail-safe, like the except below)
+            not_joined = await membership_service.find_missing(
+                context.bot, user_id, required_channels,
+                is_joined=lambda status: status in ['member', 'administrator', 'creator'],
+                fresh=bypass_cache
+            )
             
             return len(not_joined) == 0, not_joined
             
@@ -51,12 +49,25 @@ class ForceJoinChecker:
             return True, []
     
     @staticmethod
-    async def show_force_join_message(update: Update, context: ContextTypes.DEFAULT_TYPE, channels: list) -> None:
+    def get_prompt(channels: list) -> Tuple[str, InlineKeyboardMarkup]:
         """
-        Show force join message with channel buttons
+        Join prompt for these channels, rendered once per channel list version
+        Returns: (text template with {first_name}, markup)
         """
-        user = update.effective_user
+        key = (db.force_join_version, tuple(channel['channel_id'] for channel in channels))
+        prompt = _prompts.get(key)
         
+        if prompt is None:
+            if any(version != key[0] for version, _ in _prompts):
+                _prompts.clear()
+            prompt = _prompts[key] = ForceJoinChecker.render_prompt(channels)
+        return prompt
+    
+    @staticmethod
+    def render_prompt(channels: list) -> Tuple[str, InlineKeyboardMarkup]:
+        """
+        Build force join message template and channel buttons
+        """
         # Build channel buttons
         keyboard = []
         for channel in channels:
@@ -78,7 +89,7 @@ class ForceJoinChecker:
 🔒 **ACCESS REQUIRED**
 ═════════════════════════════════════════════════════
 
-Hello {user.first_name}! 👋
+Hello {{first_name}}! 👋
 
 To use this bot, you must join our official channels first.
 
@@ -97,6 +108,17 @@ Please click the buttons below to join all channels, then click **"I Joined - Ve
 ⚠️ **Note:** All features are locked until you join!
         """
         
+        return text, reply_markup
+    
+    @staticmethod
+    async def show_force_join_message(update: Update, context: ContextTypes.DEFAULT_TYPE, channels: list) -> None:
+        """
+        Show force join message with channel buttons
+        """
+        user = update.effective_user
+        template, reply_markup = ForceJoinChecker.get_prompt(channels)
+        text = template.replace('{first_name}', user.first_name)
+        
         if update.callback_query:
             await update.callback_query.answer("Please join all channels first!")
             await update.callback_query.edit_message_text(
@@ -118,8 +140,8 @@ async def verify_force_join(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     await query.answer("Verifying your membership...")
     
-    # Check membership
-    is_member, not_joined = await ForceJoinChecker.check_membership(user_id, context)
+    # Check membership (always fresh, the user says they just joined)
+    is_member, not_joined = await ForceJoinChecker.check_membership(user_id, context, bypass_cache=True)
     
     if is_member:
         # User has joined all channels
@@ -159,12 +181,11 @@ async def force_join_middleware(update: Update, context: ContextTypes.DEFAULT_TY
     """
     user_id = update.effective_user.id
     
-    # Skip for admins
-    from handlers.admin_dashboard import AdminDashboard
-    if await AdminDashboard.check_admin(user_id):
+    # Skip for admins (in-memory flag lookup)
+    if await db.is_admin(user_id):
         return True
     
-    # Check if user is verified
+    # Check if user is verified (in-memory flag lookup)
     is_verified = await db.is_user_verified(user_id)
     if is_verified:
         return True
@@ -181,5 +202,29 @@ async def force_join_middleware(update: Update, context: ContextTypes.DEFAULT_TY
         await db.mark_user_verified(user_id)
         return True
 
+async def track_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Record joins and leaves in force join channels (chat_member updates)
+    
+    Telegram only sends these for chats where the bot is an administrator.
+    Leaving revokes verification, so the next interaction re-checks.
+    """
+    change = update.chat_member
+    if not change:
+        return
+    
+    channel_id = change.chat.id
+    channels = await db.get_force_join_channels()
+    if not any(channel['channel_id'] == channel_id for channel in channels):
+        return
+    
+    user_id = change.new_chat_member.user.id
+    status = change.new_chat_member.status
+    await membership_service.record(user_id, channel_id, status, change.date)
+    
+    if status in NOT_MEMBER_STATUSES and await db.is_user_verified(user_id):
+        await db.mark_user_unverified(user_id)
+        logger.info(f"🚪 User {user_id} left force join channel {channel_id}, verification revoked")
+
 # Export
-__all__ = ['ForceJoinChecker', 'verify_force_join', 'force_join_middleware']
+__all__ = ['ForceJoinChecker', 'verify_force_join', 'force_join_middleware', 'track_chat_member']
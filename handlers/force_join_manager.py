@@ -4,6 +4,7 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.error import TelegramError
+from services.membership_service import membership_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,7 +30,7 @@ class ForceJoinManager:
         await query.answer()
         
         # Get current force join channels
-        channels = self.db.get_force_join_channels()
+        channels = await self.db.get_force_join_channels()
         
         text = """🚪 FORCE JOIN CHANNEL MANAGER
 ═══════════════════════════════════════════════════════════════
@@ -39,7 +40,7 @@ class ForceJoinManager:
 {}─ What would you like to do?
         """.format(
             len(channels),
-            "\n".join([f"✅ @{ch['username']} (ID: {ch['channel_id']})" for ch in channels]) if channels else "📭No channels added yet\n"
+            "\n".join([ForceJoinManager.format_channel_health(ch) for ch in channels]) if channels else "📭No channels added yet\n"
         )
         
         keyboard = [
@@ -53,6 +54,20 @@ class ForceJoinManager:
         await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
         return AWAIT_ACTION
     
+    @staticmethod
+    def format_channel_health(channel: dict) -> str:
+        """Channel line with its membership-check health"""
+        health = membership_service.get_channel_health(channel['channel_id'])
+        line = f"@{channel['username']} (ID: {channel['channel_id']})"
+        
+        if health['state'] == 'open':
+            return f"⛔ {line} - paused, bot can't check members (retry in {health['retry_in']}s)"
+        if health['state'] == 'half_open':
+            return f"🔄 {line} - recovering, next check probes the channel"
+        if health['state'] == 'degraded':
+            return f"⚠️ {line} - {health['failures']} failed checks"
+        return f"✅ {line}"
+    
     async def add_channel_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Start adding a new force join channel"""
         query = update.callback_query
@@ -105,7 +120,7 @@ class ForceJoinManager:
             return AWAIT_CHANNEL_ID
         
         # Check if already added
-        existing = self.db.get_force_join_channel(channel_id)
+        existing = await self.db.get_force_join_channel(channel_id)
         if existing:
             await update.message.reply_text(
                 "✅ This channel is already in force join list!\n\n"
@@ -248,7 +263,7 @@ Before confirming, make sure:
         
         try:
             # Add to database
-            self.db.add_force_join_channel(channel_id, username, title)
+            await self.db.add_force_join_channel(channel_id, username, title)
             
             text = f"""✅ CHANNEL ADDED SUCCESSFULLY!
 ═══════════════════════════════════════════════════════════════
@@ -301,7 +316,7 @@ Before confirming, make sure:
         await query.answer()
         
         # Get current force join channels
-        channels = self.db.get_force_join_channels()
+        channels = await self.db.get_force_join_channels()
         
         if not channels:
             await query.edit_message_text(
@@ -345,7 +360,7 @@ Before confirming, make sure:
         await query.answer()
         
         try:
-            channel = self.db.get_force_join_channel(channel_id)
+            channel = await self.db.get_force_join_channel(channel_id)
             
             if not channel:
                 await query.edit_message_text(
@@ -355,7 +370,7 @@ Before confirming, make sure:
                 return ConversationHandler.END
             
             # Delete from database
-            self.db.remove_force_join_channel(channel_id)
+            await self.db.remove_force_join_channel(channel_id)
             
             text = f"""✅ CHANNEL REMOVED!
 ═══════════════════════════════════════════════════════════════
@@ -5,6 +5,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from models.order import Order
 from models.course import Course
+from database.db import db
 from utils.decorators import log_command
 
 logger = logging.getLogger(__name__)
@@ -67,20 +68,23 @@ async def process_payment_verification(update: Update, context: ContextTypes.DEF
     order_id = int(query.data.split('_')[2])
     user_id = query.from_user.id
     
-    # Get order
-    order = await Order.get_by_id(order_id)
-    
-    if not order or order['user_id'] != user_id:
-        await query.edit_message_text("❌ Invalid order")
-        return
-    
-    if order['payment_status'] != 'pending':
-        await query.edit_message_text(f"❌ Order already {order['payment_status']}")
+    # Lock the order row so a double tap cannot complete it twice
+    error_text = None
+    async with db.transaction():
+        order = await Order.get_by_id(order_id, for_update=True)
+        
+        if not order or order['user_id'] != user_id:
+            error_text = "❌ Invalid order"
+        elif order['payment_status'] != 'pending':
+            error_text = f"❌ Order already {order['payment_status']}"
+        else:
+            # Mark as completed
+            await Order.mark_completed(order_id, transaction_id=f"manual_{order_id}")
+    
+    if error_text:
+        await query.edit_message_text(error_text)
         return
     
-    # Mark as completed
-    await Order.mark_completed(order_id, transaction_id=f"manual_{order_id}")
-    
     # Get course
     course = await Course.get_by_id(order['course_id'])
     
@@ -26,7 +26,7 @@ async def premium_admin_dashboard(update: Update, context: ContextTypes.DEFAULT_
     user = update.effective_user
     
     # Check if user is admin
-    if not await is_admin(user.id):
+    if not await db.is_admin(user.id):
         if query:
             await query.answer("⛔ Unauthorized access!", show_alert=True)
         else:
@@ -3,6 +3,12 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
 from services.ai_service import ai_service
+from database.db import db
+from config import AIConfig
+from services.image_preprocessor import image_preprocessor, describe_image_url
+from utils.stream_renderer import StreamRenderer
+from typing import AsyncIterator, Optional
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,6 +19,10 @@ AWAIT_IMAGE_QUESTION = 2
 AWAIT_THUMBNAIL_URL = 3
 AWAIT_PAYMENT_PROOF = 4
 
+VISION_FOOTER = "\n\n———————————————\n🤖 Powered by Gemini 2.0 Flash Vision"
+
+DEFAULT_QUESTION = "What is in this image? Describe it in detail."
+
 
 class VisionHandler:
     """Handle image analysis features"""
@@ -24,6 +34,7 @@ class VisionHandler:
         """
         query = update.callback_query
         await query.answer()
+        VisionHandler.discard_prefetch(context)
         
         keyboard = [
             [
@@ -75,6 +86,7 @@ class VisionHandler:
         """
         query = update.callback_query
         await query.answer()
+        VisionHandler.discard_prefetch(context)
         
         text = """
 🖼️ **ANALYZE IMAGE**
@@ -129,6 +141,9 @@ Type /cancel to abort.
         # Store image URL in context
         context.user_data['vision_image_url'] = image_url
         
+        # Most users pick the default question: start on it while they decide
+        VisionHandler._start_prefetch(context, image_url)
+        
         # Ask what question to ask about the image
         keyboard = [
             [InlineKeyboardButton("📝 Default Question", callback_data='vision_default_q')],
@@ -154,10 +169,18 @@ Type /cancel to abort.
         await query.answer()
         
         image_url = context.user_data.get('vision_image_url')
+        prefetch = context.user_data.pop('vision_prefetch', None)
         
         if query.data == 'vision_default_q':
-            question = "What is in this image? Describe it in detail."
+            question = DEFAULT_QUESTION
+            if prefetch and not prefetch['analysis'].done():
+                # Still queued at NORMAL priority or running: the user is waiting
+                # now, so ask again at interactive priority instead
+                VisionHandler._cancel_prefetch(prefetch)
+            elif prefetch:
+                prefetch['expiry'].cancel()
         else:
+            VisionHandler._cancel_prefetch(prefetch)
             await query.edit_message_text(
                 "✏️ **Custom Question**\n\n"
                 "Type your question about the image:\n"
@@ -165,35 +188,27 @@ Type /cancel to abort.
             )
             return AWAIT_IMAGE_QUESTION
         
-        # Perform analysis
+        # Perform analysis, the answer streams into this message
         await query.edit_message_text("🤖 Analyzing image with Gemini 2.0 Flash Vision...")
         
         try:
-            result = await ai_service.analyze_image(image_url, question)
+            keyboard = [
+                [InlineKeyboardButton("🔄 Analyze Another", callback_data='vision_analyze')],
+                [InlineKeyboardButton("⬅️ Back to Vision Menu", callback_data='vision_menu')]
+            ]
             
-            if result:
-                response = f"""
-✅ **IMAGE ANALYSIS COMPLETE**
-
-🖼️ **Image:** {image_url[:50]}...
-
-💬 **AI Response:**
-{result}
-
-———————————————
-🤖 Powered by Gemini 2.0 Flash Vision
-                """
-                
-                keyboard = [
-                    [InlineKeyboardButton("🔄 Analyze Another", callback_data='vision_analyze')],
-                    [InlineKeyboardButton("⬅️ Back to Vision Menu", callback_data='vision_menu')]
-                ]
-                
-                await query.edit_message_text(
-                    response,
+            renderer = StreamRenderer(
+                query.message,
+                header=f"🖼️ **IMAGE ANALYSIS**\n\n🖼️ **Image:** {describe_image_url(image_url)}\n\n💬 **AI Response:**\n",
+                footer=VISION_FOOTER
+            )
+            async with db.released():
+                result = await renderer.render(
+                    VisionHandler._analysis_chunks(prefetch, image_url, question),
                     reply_markup=InlineKeyboardMarkup(keyboard)
                 )
-            else:
+            
+            if not result:
                 await query.edit_message_text(
                     "❌ Analysis failed. Please try again or check the image URL."
                 )
@@ -206,6 +221,92 @@ Type /cancel to abort.
         
         return ConversationHandler.END
     
+    @staticmethod
+    def _start_prefetch(context: ContextTypes.DEFAULT_TYPE, image_url: str):
+        """
+        Speculatively download/preprocess the image and run the default
+        question, keeping both tasks under the conversation's user_data
+        
+        The analysis runs at NORMAL priority so it never takes a slot ahead
+        of users who are actually waiting, and outside the shared flight so
+        cancelling it stops the API request. It is cancelled when the user
+        picks a custom question, /cancel or a timeout ends the conversation,
+        another vision flow starts, or nobody claims it within
+        VISION_PREFETCH_TTL (the user walked away).
+        """
+        VisionHandler.discard_prefetch(context)
+        
+        prepared = asyncio.create_task(image_preprocessor.prepare(image_url))
+        prefetch = {
+            'image_url': image_url,
+            'prepared': prepared,
+            'analysis': asyncio.create_task(VisionHandler._speculate(prepared, image_url))
+        }
+        prefetch['expiry'] = asyncio.get_running_loop().call_later(
+            AIConfig.VISION_PREFETCH_TTL, VisionHandler._expire_prefetch, context.user_data, prefetch
+        )
+        context.user_data['vision_prefetch'] = prefetch
+    
+    @staticmethod
+    async def _speculate(prepared: asyncio.Task, image_url: str) -> Optional[str]:
+        # Shielded: cancelling the analysis keeps the image warm for a custom question
+        if await asyncio.shield(prepared) is None:
+            return None
+        return await ai_service.analyze_image(image_url, DEFAULT_QUESTION, speculative=True)
+    
+    @staticmethod
+    def _expire_prefetch(user_data: dict, prefetch: dict):
+        if user_data.get('vision_prefetch') is prefetch:
+            del user_data['vision_prefetch']
+        VisionHandler._cancel_prefetch(prefetch)
+    
+    @staticmethod
+    def _cancel_prefetch(prefetch: Optional[dict]):
+        """Drop a speculative analysis nobody will use (the image download is kept)"""
+        if not prefetch:
+            return
+        prefetch['expiry'].cancel()
+        if not prefetch['analysis'].done():
+            prefetch['analysis'].cancel()
+            logger.info("🛑 Speculative image analysis cancelled")
+    
+    @staticmethod
+    def discard_prefetch(context: ContextTypes.DEFAULT_TYPE):
+        """Cancel and forget any speculative analysis of this user"""
+        VisionHandler._cancel_prefetch(context.user_data.pop('vision_prefetch', None))
+    
+    @staticmethod
+    async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        /cancel fallback and ConversationHandler.TIMEOUT handler of the vision
+        conversations: drops the speculative analysis along with the state
+        """
+        VisionHandler.discard_prefetch(context)
+        context.user_data.pop('vision_image_url', None)
+        context.user_data.pop('thumbnail_url', None)
+        
+        if update and update.effective_message and update.message:
+            await update.message.reply_text("❌ Cancelled.")
+        return ConversationHandler.END
+    
+    @staticmethod
+    async def _analysis_chunks(prefetch: Optional[dict], image_url: str, question: str) -> AsyncIterator[str]:
+        """
+        The prefetched default answer if it finished, otherwise a fresh
+        streamed analysis
+        """
+        analysis = prefetch['analysis'] if prefetch else None
+        if (analysis and prefetch['image_url'] == image_url and question == DEFAULT_QUESTION
+                and analysis.done() and not analysis.cancelled() and analysis.exception() is None):
+            result = analysis.result()
+            if result:
+                logger.info("⚡ Served image analysis from speculative prefetch")
+                yield result
+                return
+        
+        async for chunk in ai_service.analyze_image_stream(image_url, question):
+            yield chunk
+    
     @staticmethod
     async def start_thumbnail_review(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -213,6 +314,7 @@ Type /cancel to abort.
         """
         query = update.callback_query
         await query.answer()
+        VisionHandler.discard_prefetch(context)
         
         text = """
 🇿 **COURSE THUMBNAIL REVIEW**
@@ -270,38 +372,13 @@ Type /cancel to abort.
                         image_url = line.split('Image URL:')[1].strip()
                 
                 if course_name and image_url:
-                    await update.message.reply_text("🔍 Reviewing thumbnail...")
-                    
-                    result = await ai_service.analyze_course_thumbnail(image_url, course_name)
-                    
-                    if result:
-                        response = f"""
-✅ **THUMBNAIL REVIEW COMPLETE**
-
-🎨 **Course:** {course_name}
-🖼️ **Thumbnail:** {image_url[:50]}...
-
-📝 **AI Feedback:**
-{result}
-
-———————————————
-🤖 Powered by Gemini 2.0 Flash Vision
-                        """
-                        
-                        keyboard = [
-                            [InlineKeyboardButton("🔄 Review Another", callback_data='vision_thumbnail')],
-                            [InlineKeyboardButton("⬅️ Back", callback_data='vision_menu')]
-                        ]
-                        
-                        await update.message.reply_text(
-                            response,
-                            reply_markup=InlineKeyboardMarkup(keyboard)
-                        )
-                    else:
-                        await update.message.reply_text(
-                            "❌ Review failed. Please try again."
-                        )
-                    
+                    await VisionHandler._stream_thumbnail_review(
+                        update,
+                        image_url,
+                        course_name,
+                        f"🎨 **THUMBNAIL REVIEW**\n\n🎨 **Course:** {course_name}\n"
+                        f"🖼️ **Thumbnail:** {describe_image_url(image_url)}\n\n📝 **AI Feedback:**\n"
+                    )
                     return ConversationHandler.END
             
             # If just course name (after photo upload)
@@ -309,37 +386,12 @@ Type /cancel to abort.
                 course_name = text.strip()
                 image_url = context.user_data['thumbnail_url']
                 
-                await update.message.reply_text("🔍 Reviewing thumbnail...")
-                
-                result = await ai_service.analyze_course_thumbnail(image_url, course_name)
-                
-                if result:
-                    response = f"""
-✅ **THUMBNAIL REVIEW COMPLETE**
-
-🎨 **Course:** {course_name}
-
-📝 **AI Feedback:**
-{result}
-
-———————————————
-🤖 Powered by Gemini 2.0 Flash Vision
-                    """
-                    
-                    keyboard = [
-                        [InlineKeyboardButton("🔄 Review Another", callback_data='vision_thumbnail')],
-                        [InlineKeyboardButton("⬅️ Back", callback_data='vision_menu')]
-                    ]
-                    
-                    await update.message.reply_text(
-                        response,
-                        reply_markup=InlineKeyboardMarkup(keyboard)
-                    )
-                else:
-                    await update.message.reply_text(
-                        "❌ Review failed. Please try again."
-                    )
-                
+                await VisionHandler._stream_thumbnail_review(
+                    update,
+                    image_url,
+                    course_name,
+                    f"🎨 **THUMBNAIL REVIEW**\n\n🎨 **Course:** {course_name}\n\n📝 **AI Feedback:**\n"
+                )
                 return ConversationHandler.END
         
         await update.message.reply_text(
@@ -347,6 +399,27 @@ Type /cancel to abort.
         )
         return AWAIT_THUMBNAIL_URL
     
+    @staticmethod
+    async def _stream_thumbnail_review(update: Update, image_url: str, course_name: str, header: str):
+        """
+        Stream a thumbnail review into a reply as it is generated
+        """
+        status = await update.message.reply_text("🔍 Reviewing thumbnail...")
+        
+        keyboard = [
+            [InlineKeyboardButton("🔄 Review Another", callback_data='vision_thumbnail')],
+            [InlineKeyboardButton("⬅️ Back", callback_data='vision_menu')]
+        ]
+        
+        async with db.released():
+            result = await StreamRenderer(status, header=header, footer=VISION_FOOTER).render(
+                ai_service.analyze_course_thumbnail_stream(image_url, course_name),
+                reply_markup=InlineKeyboardMarkup(keyboard)
+            )
+        
+        if not result:
+            await status.edit_text("❌ Review failed. Please try again.")
+    
     @staticmethod
     async def start_payment_verification(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -354,6 +427,7 @@ Type /cancel to abort.
         """
         query = update.callback_query
         await query.answer()
+        VisionHandler.discard_prefetch(context)
         
         text = """
 💳 **PAYMENT PROOF VERIFICATION**
@@ -396,12 +470,16 @@ Type /cancel to abort.
         await update.message.reply_text("🔍 Verifying payment proof...")
         
         try:
-            result = await ai_service.analyze_payment_proof(image_url)
+            async with db.released():
+                result = await ai_service.analyze_payment_proof(image_url, update.effective_user.id)
             
             if result and isinstance(result, dict):
-                valid_emoji = "✅" if result.get('valid') else "❌"
+                if result.get('needs_review'):
+                    valid_emoji = "⚠️ NEEDS MANUAL REVIEW -"
+                else:
+                    valid_emoji = "✅" if result.get('valid') else "❌"
                 
-                response = f"""
+                response = f"""{VisionHandler._proof_reuse_warning(result)}
 {valid_emoji} **PAYMENT VERIFICATION RESULT**
 
 💳 **Method:** {result.get('method', 'N/A')}
@@ -440,6 +518,26 @@ Type /cancel to abort.
         
         return ConversationHandler.END
     
+    @staticmethod
+    def _proof_reuse_warning(result: dict) -> str:
+        """Warning lines for a proof already seen in the proof index"""
+        duplicate = result.get('duplicate_of')
+        reused = result.get('transaction_reused')
+        
+        if duplicate:
+            kind = "identical" if duplicate['exact'] else "near-identical"
+            who = "by this user" if duplicate['same_user'] else f"by user {duplicate['user_id']}"
+            return (
+                f"\n⚠️ **DUPLICATE PROOF:** {kind} screenshot already submitted {who} "
+                f"on {duplicate['submitted_at']:%Y-%m-%d %H:%M} (proof #{duplicate['proof_id']})\n"
+            )
+        if reused:
+            return (
+                f"\n⚠️ **TRANSACTION ID REUSED:** already seen on proof #{reused['proof_id']} "
+                f"from user {reused['user_id']}, {reused['submitted_at']:%Y-%m-%d %H:%M}\n"
+            )
+        return ""
+    
     @staticmethod
     async def test_vision_api(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -450,7 +548,8 @@ Type /cancel to abort.
         
         await query.edit_message_text("🧪 Testing Vision API with sample image...")
         
-        success = await ai_service.test_vision()
+        async with db.released():
+            success = await ai_service.test_vision()
         
         if success:
             keyboard = [
@@ -4,11 +4,18 @@
 import logging
 import os
 from pathlib import Path
+from telegram import Update
 from telegram.ext import (
     Application, CommandHandler, ConversationHandler,
-    CallbackQueryHandler, MessageHandler, filters
+    CallbackQueryHandler, ChatMemberHandler, MessageHandler, TypeHandler, filters
 )
-from config import BotConfig
+from config import BotConfig, AppConfig
+from middleware.db_session import PinnedConnectionUpdateProcessor
+from middleware.ban_gate import drop_banned_users
+from services.reverification_service import reverification_sweeper
+from services.http_session import http_session
+from services.caption_job import caption_job_runner
+from services.ai_usage import ai_usage
 
 # Import admin authentication
 from handlers.admin_auth import (
@@ -30,6 +37,11 @@ from handlers.admin_dashboard import (
     manage_admins_menu,
     content_editor_menu,
     ai_assistant_menu,
+    caption_job_menu,
+    ai_usage_menu,
+    caption_job_action,
+    export_menu,
+    export_data,
     BROADCAST_MESSAGE
 )
 
@@ -46,7 +58,7 @@ from handlers.force_join_manager import (
 
 # Import force join middleware
 try:
-    from middleware.force_join import force_join_middleware, verify_force_join
+    from handlers.force_join_checker import force_join_middleware, verify_force_join, track_chat_member
 except ImportError:
     logger = logging.getLogger(__name__)
     logger.warning("⚠️ force_join middleware not found, force join disabled")
@@ -54,6 +66,8 @@ except ImportError:
         return True
     async def verify_force_join(update, context):
         await update.callback_query.answer("✅ Verified")
+    async def track_chat_member(update, context):
+        return
 
 # Import existing handlers - with error handling
 try:
@@ -381,6 +395,12 @@ async def post_init(application: Application) -> None:
     """
     try:
         await db.connect()
+        await db.invalidation.start()
+        await db.admin_sessions.start()
+        await http_session.start()
+        reverification_sweeper.start(application.bot)
+        await caption_job_runner.resume(application.bot)
+        await ai_usage.start()
         logger.info("✅ Database connection initialized")
         logger.info("🚀 Premium Admin Dashboard Ready")
         logger.info("🔐 Secure 2-Step Authentication System Active")
@@ -396,6 +416,12 @@ async def post_shutdown(application: Application) -> None:
     Close database connection on shutdown
     """
     try:
+        await reverification_sweeper.stop()
+        await caption_job_runner.stop()
+        await ai_usage.stop()
+        await db.admin_sessions.stop()
+        await http_session.close()
+        await db.invalidation.stop()
         await db.disconnect()
         logger.info("✅ Database connection closed")
     except Exception as e:
@@ -407,16 +433,28 @@ def main():
     Start the bot with secure admin authentication
     """
     try:
-        # Create application
-        application = Application.builder().token(BotConfig.TELEGRAM_BOT_TOKEN).build()
+        # Create application - every update runs in a DB unit of work (one pinned connection)
+        application = (
+            Application.builder()
+            .token(BotConfig.TELEGRAM_BOT_TOKEN)
+            .concurrent_updates(PinnedConnectionUpdateProcessor(AppConfig.MAX_CONCURRENT_UPDATES))
+            .build()
+        )
         
         # Setup database lifecycle hooks
         application.post_init = post_init
         application.post_shutdown = post_shutdown
         
+        # === INGRESS: drop banned users before any handler runs ===
+        application.add_handler(TypeHandler(Update, drop_banned_users), group=-1)
+        
         # === CORE COMMANDS ===
         application.add_handler(CommandHandler('start', protected_start))
         application.add_handler(CommandHandler('help', help_command))
+        application.add_handler(CallbackQueryHandler(verify_force_join, pattern='^verify_force_join$'))
+        
+        # === FORCE JOIN MEMBERSHIP EVENTS (joins/leaves in channels the bot administers) ===
+        application.add_handler(ChatMemberHandler(track_chat_member, ChatMemberHandler.CHAT_MEMBER))
         
         # === ADMIN AUTHENTICATION SYSTEM (Button-only access, NO /admin command) ===
         application.add_handler(admin_auth_conv_handler)
@@ -448,6 +486,13 @@ def main():
         
         # AI assistant
         application.add_handler(CallbackQueryHandler(ai_assistant_menu, pattern='^admin_ai$'))
+        application.add_handler(CallbackQueryHandler(caption_job_menu, pattern='^ai_captions$'))
+        application.add_handler(CallbackQueryHandler(ai_usage_menu, pattern='^ai_usage$'))
+        application.add_handler(CallbackQueryHandler(caption_job_action, pattern='^ai_captions_(start_(\\d+|all)|cancel)$'))
+        
+        # Data export
+        application.add_handler(CallbackQueryHandler(export_menu, pattern='^admin_export$'))
+        application.add_handler(CallbackQueryHandler(export_data, pattern='^export_(users|orders|credits)_(csv|json)$'))
         
         # === INLINE KEYBOARD HANDLERS (Main Menu) ===
         application.add_handler(CallbackQueryHandler(menu_courses, pattern='^menu_courses$'))
@@ -495,7 +540,7 @@ def main():
         logger.info("🔐 Security: Code '122911' + Question 'avik'")
         logger.info("🚪 Force Join Manager: Professional button-based interface")
         logger.info("🔐 Admin access: Button only (no /admin command)")
-        application.run_polling(allowed_updates=['message', 'callback_query'])
+        application.run_polling(allowed_updates=['message', 'callback_query', 'chat_member'])
     except Exception as e:
         logger.error(f"❌ Fatal error in main: {e}")
         raise
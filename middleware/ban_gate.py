@@ -0,0 +1,27 @@
+# Ban Gate Middleware - Drop updates from banned users at ingress
+
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes, ApplicationHandlerStop
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+
+async def drop_banned_users(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Stop processing updates from banned users
+    
+    Registered as a TypeHandler in the earliest handler group, so a banned
+    user costs one in-memory flag lookup and never reaches a handler or
+    the database. chat_member updates pass: they are channel events about
+    the user, and track_chat_member must still record a banned user leaving.
+    """
+    user = update.effective_user
+    if user and not update.chat_member and db.is_user_banned(user.id):
+        logger.debug(f"🚫 Dropped update from banned user {user.id}")
+        raise ApplicationHandlerStop
+
+
+# Export
+__all__ = ['drop_banned_users']
@@ -0,0 +1,34 @@
+# Database Session Middleware - One pinned connection per update
+
+import logging
+from typing import Any, Awaitable
+from telegram.ext import BaseUpdateProcessor
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+
+class PinnedConnectionUpdateProcessor(BaseUpdateProcessor):
+    """
+    Update processor that runs every update inside a database unit of work
+    
+    All db / model helpers awaited while handling an update share one pooled
+    connection, acquired on the first query and released when the update is
+    done. Handlers wrap long non-DB awaits (AI calls) in db.released() so
+    the connection goes back to the pool meanwhile. Keep
+    max_concurrent_updates at or below the pool's max_size.
+    """
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        async with db.unit_of_work():
+            await coroutine
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+
+
+# Export
+__all__ = ['PinnedConnectionUpdateProcessor']
@@ -46,6 +46,7 @@ class Course:
         """Update AI-generated caption"""
         query = "UPDATE courses SET ai_caption = $1, updated_at = NOW() WHERE id = $2"
         await db.execute(query, caption, course_id)
+        await db.invalidation.publish('courses', course_id)
         logger.info(f"✅ Caption updated for course {course_id}")
     
     @staticmethod
@@ -53,6 +54,7 @@ class Course:
         """Update channel post ID after posting"""
         query = "UPDATE courses SET channel_post_id = $1, updated_at = NOW() WHERE id = $2"
         await db.execute(query, channel_post_id, course_id)
+        await db.invalidation.publish('courses', course_id)
         logger.info(f"✅ Channel post updated for course {course_id}")
     
     @staticmethod
@@ -60,6 +62,7 @@ class Course:
         """Update demo video file ID"""
         query = "UPDATE courses SET demo_video_id = $1, updated_at = NOW() WHERE id = $2"
         await db.execute(query, video_file_id, course_id)
+        await db.invalidation.publish('courses', course_id)
         logger.info(f"✅ Demo video updated for course {course_id}")
     
     @staticmethod
@@ -67,12 +70,14 @@ class Course:
         """Update rating and review count"""
         query = "UPDATE courses SET rating = $1, reviews = $2, updated_at = NOW() WHERE id = $3"
         await db.execute(query, rating, reviews, course_id)
+        await db.invalidation.publish('courses', course_id)
     
     @staticmethod
     async def soft_delete(course_id: int):
         """Soft delete course (mark as deleted)"""
         query = "UPDATE courses SET deleted_at = NOW() WHERE id = $1"
         await db.execute(query, course_id)
+        await db.invalidation.publish('courses', course_id)
         logger.info(f"✅ Course {course_id} deleted")
     
     @staticmethod
@@ -80,6 +85,7 @@ class Course:
         """Permanently delete course"""
         query = "DELETE FROM courses WHERE id = $1"
         await db.execute(query, course_id)
+        await db.invalidation.publish('courses', course_id)
         logger.info(f"✅ Course {course_id} permanently deleted")
     
     @staticmethod
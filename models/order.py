@@ -22,9 +22,11 @@ class Order:
         return result
     
     @staticmethod
-    async def get_by_id(order_id: int):
-        """Get order by ID"""
+    async def get_by_id(order_id: int, for_update: bool = False):
+        """Get order by ID (for_update locks the row; use inside db.transaction())"""
         query = "SELECT * FROM orders WHERE id = $1"
+        if for_update:
+            query += " FOR UPDATE"
         return await db.fetchrow(query, order_id)
     
     @staticmethod
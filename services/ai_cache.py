@@ -0,0 +1,139 @@
+# 🗃️ AI Response Cache - In-memory LRU in front of a Postgres table
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+from config import AIConfig
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+
+class AIResponseCache:
+    """
+    Two-tier cache for AI generations
+    
+    Keys are a SHA-256 of model, prompt and sampling parameters, so any
+    change to what would be sent to the API is a different entry. Lookups
+    hit the in-memory LRU first, then the ai_response_cache table (shared
+    by every instance and kept across restarts), which refills the LRU.
+    Entries expire after CACHE_TTL in both tiers.
+    
+    Failed generations (None) are never stored. Callers that want a fresh
+    answer skip get() and put() the new one, which replaces the old entry
+    everywhere.
+    """
+    
+    PURGE_EVERY = 100  # writes between deletes of expired rows
+    
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        self.max_entries = max_entries or AIConfig.CACHE_SIZE
+        self.ttl = AIConfig.CACHE_TTL if ttl is None else ttl
+        self.enabled = AIConfig.CACHE_ENABLED
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._writes = 0
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        db.invalidation.subscribe('ai_cache', self._evict, self._evict)
+    
+    @staticmethod
+    def make_key(model: str, prompt: str, params: Dict) -> str:
+        """Stable hash of everything that shapes the response"""
+        raw = json.dumps({'model': model, 'prompt': prompt, 'params': params}, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Cached response or None (miss, expired or cache disabled)"""
+        if not self.enabled:
+            return None
+        
+        entry = self._cache.get(key)
+        if entry is not None:
+            response, expires = entry
+            if expires > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return response
+            del self._cache[key]
+        
+        try:
+            row = await db.fetchrow(
+                "SELECT response, expires_at FROM ai_response_cache WHERE key = $1 AND expires_at > NOW()",
+                key
+            )
+        except Exception as e:
+            logger.error(f"Error reading AI cache: {e}")
+            row = None
+        
+        if row is None:
+            self.misses += 1
+            return None
+        
+        self.db_hits += 1
+        remaining = (row['expires_at'] - datetime.now(timezone.utc)).total_seconds()
+        self._remember(key, row['response'], remaining)
+        return row['response']
+    
+    async def put(self, key: str, model: str, response: str, replace: bool = False):
+        """
+        Store a response in both tiers
+        
+        Args:
+            replace: A regenerated answer, evict the old one on other instances
+        """
+        if not self.enabled or response is None:
+            return
+        
+        self._remember(key, response, self.ttl)
+        
+        try:
+            await db.execute(
+                """INSERT INTO ai_response_cache (key, model, response, expires_at)
+                   VALUES ($1, $2, $3, NOW() + $4::INTERVAL)
+                   ON CONFLICT (key) DO UPDATE
+                   SET response = EXCLUDED.response, created_at = NOW(), expires_at = EXCLUDED.expires_at""",
+                key, model, response, timedelta(seconds=self.ttl)
+            )
+            if replace:
+                await db.invalidation.publish('ai_cache', key, local=False)
+            
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                await db.execute("DELETE FROM ai_response_cache WHERE expires_at <= NOW()")
+        except Exception as e:
+            logger.error(f"Error writing AI cache: {e}")
+    
+    def _remember(self, key: str, response: str, ttl: float):
+        if ttl <= 0:
+            return
+        self._cache[key] = (response, time.monotonic() + ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
+    async def _evict(self, key: Optional[str] = None):
+        """Invalidation subscriber: drop one entry (or all)"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+    
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        lookups = self.hits + self.db_hits + self.misses
+        return {
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'db_hits': self.db_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.db_hits) / lookups * 100, 1) if lookups else 0.0
+        }
+
+
+# Global AI response cache instance
+ai_cache = AIResponseCache()
@@ -0,0 +1,161 @@
+# 🚦 AI Request Scheduler - Concurrency cap, priorities and shared 429 backoff
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from config import AIConfig
+
+logger = logging.getLogger(__name__)
+
+
+class AIScheduler:
+    """
+    Gate in front of every OpenRouter request
+    
+    At most MAX_CONCURRENT_REQUESTS calls run at once; the rest wait in a
+    priority queue (lowest value first, FIFO within a class) so interactive
+    vision and payment-proof checks overtake bulk generation.
+    
+    A 429 on any call opens a backoff window for everyone: no new request
+    starts until it passes. The window honours Retry-After when the API
+    sends one and otherwise doubles with each consecutive 429 (capped),
+    resetting on the next success.
+    
+    Usage:
+        async with ai_scheduler.slot(AIScheduler.INTERACTIVE):
+            ... one API request ...
+    """
+    
+    INTERACTIVE = 0  # vision, payment proofs, streamed replies
+    NORMAL = 1       # admin-triggered generation
+    BULK = 2         # background jobs
+    
+    PRIORITY_NAMES = {INTERACTIVE: 'interactive', NORMAL: 'normal', BULK: 'bulk'}
+    
+    def __init__(self, max_concurrent: int = None):
+        self.max_concurrent = max_concurrent or AIConfig.MAX_CONCURRENT_REQUESTS
+        self.base_backoff = AIConfig.RATE_LIMIT_BACKOFF
+        self.max_backoff = AIConfig.RATE_LIMIT_MAX_BACKOFF
+        self._active = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._blocked_until = 0.0
+        self._consecutive_429 = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.completed = 0
+        self.rate_limited_count = 0
+    
+    @asynccontextmanager
+    async def slot(self, priority: int = NORMAL):
+        """Hold one request slot for the duration of the block"""
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+    
+    async def _acquire(self, priority: int):
+        if self.has_capacity():
+            self._active += 1
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), future))
+        self._dispatch()
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the cancel landed: hand the slot on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+    
+    def _release(self):
+        self._active -= 1
+        self.completed += 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        """Grant free slots to the highest-priority waiters"""
+        remaining = self._backoff_remaining()
+        if remaining:
+            if self._wakeup is None:
+                self._wakeup = asyncio.get_running_loop().call_later(remaining, self._end_backoff)
+            return
+        
+        while self._queue and self._active < self.max_concurrent:
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():  # waiter was cancelled
+                continue
+            self._active += 1
+            future.set_result(None)
+    
+    def _end_backoff(self):
+        self._wakeup = None
+        self._dispatch()
+    
+    def _backoff_remaining(self) -> float:
+        return max(0.0, self._blocked_until - time.monotonic())
+    
+    def has_capacity(self) -> bool:
+        """Whether a new request would start right away"""
+        return self._active < self.max_concurrent and not self._queue and not self._backoff_remaining()
+    
+    def rate_limited(self, retry_after: Optional[float] = None):
+        """
+        Report a 429, pausing all new requests
+        
+        Args:
+            retry_after: Seconds from the Retry-After header, if any
+        """
+        self.rate_limited_count += 1
+        self._consecutive_429 += 1
+        if retry_after is None:
+            retry_after = min(self.base_backoff * 2 ** (self._consecutive_429 - 1), self.max_backoff)
+        
+        blocked_until = time.monotonic() + retry_after
+        if blocked_until > self._blocked_until:
+            self._blocked_until = blocked_until
+            if self._wakeup:
+                self._wakeup.cancel()
+                self._wakeup = None
+            self._dispatch()
+            logger.warning(f"⏱️ OpenRouter rate limit, pausing AI requests for {retry_after:.1f}s")
+    
+    def succeeded(self):
+        """Report a successful call, resetting the backoff growth"""
+        self._consecutive_429 = 0
+    
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After header in seconds (HTTP-date values are ignored)"""
+        try:
+            return max(0.0, float(value)) if value else None
+        except ValueError:
+            return None
+    
+    def get_stats(self) -> Dict:
+        """Queue depth per priority class, active calls and backoff state"""
+        queued = {name: 0 for name in self.PRIORITY_NAMES.values()}
+        for priority, _, future in self._queue:
+            if not future.done():
+                queued[self.PRIORITY_NAMES.get(priority, str(priority))] += 1
+        
+        return {
+            'active': self._active,
+            'max_concurrent': self.max_concurrent,
+            'queued': queued,
+            'queue_depth': sum(queued.values()),
+            'backoff_remaining': round(self._backoff_remaining(), 1),
+            'rate_limited': self.rate_limited_count,
+            'completed': self.completed
+        }
+
+
+# Global AI scheduler instance
+ai_scheduler = AIScheduler()
@@ -4,8 +4,17 @@ import aiohttp
 import asyncio
 import logging
 import json
-from typing import Optional, Dict, List, AsyncIterator
+from typing import Optional, Dict, List, AsyncIterator, Tuple
 from config import AIConfig
+from services.http_session import http_session
+from services.ai_cache import ai_cache
+from services.single_flight import SingleFlight
+from services.ai_scheduler import AIScheduler, ai_scheduler
+from services.model_router import model_router
+from services.ai_usage import ai_usage, tracked
+from services.image_preprocessor import image_preprocessor, describe_image_url
+from services.proof_index import proof_index, normalize_transaction_id
+from utils.stream_renderer import StreamInterrupted
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -19,14 +28,23 @@ class AIService:
         self.api_base = AIConfig.OPENROUTER_API_BASE
         self.model = AIConfig.AI_MODEL  # google/gemini-2.0-flash-exp:free
         self.enabled = AIConfig.AI_ENABLED
+        # Primary first; later models take over on failure or are hedged to when it is slow
+        self.models = [self.model] + [model for model in AIConfig.FALLBACK_MODELS if model != self.model]
+        # Identical concurrent requests (double taps, several admins) share one API call
+        self._flights = SingleFlight()
     
-    async def analyze_image(self, image_url: str, question: str = "What is in this image?") -> Optional[str]:
+    @tracked
+    async def analyze_image(self, image_url: str, question: str = "What is in this image?",
+                            speculative: bool = False) -> Optional[str]:
         """
         Analyze image using Gemini 2.0 Flash Vision
         
         Args:
             image_url: URL of the image to analyze
             question: Question to ask about the image
+            speculative: Nobody is waiting yet: run at NORMAL priority and
+                outside the shared flight, so cancelling the caller stops
+                the request itself
         
         Returns:
             AI analysis of the image or None if failed
@@ -35,13 +53,17 @@ class AIService:
             logger.warning("AI features disabled")
             return None
         
-        logger.info(f"🖼️ Analyzing image: {image_url[:50]}...")
+        logger.info(f"🖼️ Analyzing image: {describe_image_url(image_url)}")
+        
+        if speculative:
+            return await self._post_vision(question, image_url, AIScheduler.NORMAL)
         
         return await self._call_vision_api(
             text=question,
             image_url=image_url
         )
     
+    @tracked
     async def analyze_course_thumbnail(self, image_url: str, course_name: str) -> Optional[str]:
         """
         Analyze course thumbnail and provide feedback
@@ -56,7 +78,14 @@ class AIService:
         if not self.enabled:
             return None
         
-        prompt = f"""
+        return await self._call_vision_api(
+            text=self._thumbnail_prompt(course_name),
+            image_url=image_url
+        )
+    
+    @staticmethod
+    def _thumbnail_prompt(course_name: str) -> str:
+        return f"""
 Analyze this course thumbnail for "{course_name}".
 
 Provide:
@@ -68,18 +97,26 @@ Provide:
 
 Keep response under 200 words.
         """
-        
-        return await self._call_vision_api(
-            text=prompt,
-            image_url=image_url
-        )
     
-    async def analyze_payment_proof(self, image_url: str) -> Optional[Dict[str, any]]:
+    @tracked
+    async def analyze_payment_proof(self, image_url: str, user_id: Optional[int] = None) -> Optional[Dict[str, any]]:
         """
         Analyze payment proof screenshot
         
+        The screenshot is looked up in the perceptual-hash proof index first.
+        An exact duplicate of an already analyzed proof is answered from the
+        index with no vision call. A near-duplicate is still analyzed, since
+        templated payment screens hash alike, and counts as a duplicate only
+        if the model reads the same transaction ID off it. Duplicates are
+        flagged via 'duplicate_of'; a new screenshot whose transaction ID was
+        already seen on a different image is flagged via
+        'transaction_reused'. Any duplicate or reused transaction ID, whoever
+        submitted the original, is returned with valid=False and
+        needs_review=True (the model's verdict in 'model_valid').
+        
         Args:
             image_url: URL of the payment screenshot
+            user_id: Telegram user submitting the proof
         
         Returns:
             Dictionary with verification details or None
@@ -87,6 +124,14 @@ Keep response under 200 words.
         if not self.enabled:
             return None
         
+        fingerprint = await image_preprocessor.fingerprint(image_url)
+        match = await proof_index.find_similar(fingerprint) if fingerprint is not None else None
+        if match and match['distance'] == 0:
+            logger.warning(f"⚠️ Payment proof is identical to proof #{match['id']}")
+            result = dict(match['result'])
+            self._mark_duplicate(result, match, user_id)
+            return result
+        
         prompt = """
 Analyze this payment screenshot.
 
@@ -116,17 +161,68 @@ Respond in JSON format:
             image_url=image_url
         )
         
-        if result:
-            try:
-                # Try to parse JSON response
-                return json.loads(result)
-            except json.JSONDecodeError:
-                logger.warning("AI response not in JSON format, returning raw text")
-                return {"raw_response": result, "valid": False}
+        if not result:
+            return None
         
-        return None
+        try:
+            # Try to parse JSON response (the model often wraps it in a ``` fence)
+            parsed = json.loads(result.strip().strip('`').removeprefix('json').strip())
+        except json.JSONDecodeError:
+            logger.warning("AI response not in JSON format, returning raw text")
+            return {"raw_response": result, "valid": False}
+        
+        if not isinstance(parsed, dict):
+            return {"raw_response": result, "valid": False}
+        
+        transaction_id = normalize_transaction_id(parsed.get('transaction_id'))
+        if match and transaction_id == match['transaction_id']:
+            logger.warning(f"⚠️ Payment proof matches proof #{match['id']} ({match['distance']} bits apart)")
+            self._mark_duplicate(parsed, match, user_id)
+            return parsed
+        
+        if transaction_id:
+            previous = await proof_index.find_by_transaction(transaction_id)
+            if previous:
+                logger.warning(f"⚠️ Transaction ID reused from payment proof #{previous['id']}")
+                parsed['transaction_reused'] = {
+                    'proof_id': previous['id'],
+                    'user_id': previous['user_id'],
+                    'submitted_at': previous['created_at']
+                }
+                self._flag_for_review(parsed)
+        
+        if fingerprint is not None:
+            stored = {
+                key: value for key, value in parsed.items()
+                if key not in ('transaction_reused', 'needs_review', 'model_valid')
+            }
+            stored['valid'] = parsed.get('model_valid', parsed.get('valid'))
+            await proof_index.record(fingerprint, stored, user_id)
+        
+        return parsed
+    
+    @staticmethod
+    def _mark_duplicate(result: Dict, match: Dict, user_id: Optional[int]):
+        result['duplicate_of'] = {
+            'proof_id': match['id'],
+            'distance': match['distance'],
+            'exact': match['distance'] == 0,
+            'user_id': match['user_id'],
+            'same_user': user_id is not None and match['user_id'] == user_id,
+            'submitted_at': match['created_at']
+        }
+        AIService._flag_for_review(result)
     
-    async def generate_course_description(self, course_name: str, topics: str, level: str = "Beginner") -> Optional[str]:
+    @staticmethod
+    def _flag_for_review(result: Dict):
+        """A reused proof is never valid on its own: keep the model's verdict aside"""
+        result['model_valid'] = result.get('valid')
+        result['valid'] = False
+        result['needs_review'] = True
+    
+    @tracked
+    async def generate_course_description(self, course_name: str, topics: str, level: str = "Beginner",
+                                          regenerate: bool = False) -> Optional[str]:
         """
         Generate professional course description using AI
         
@@ -134,6 +230,7 @@ Respond in JSON format:
             course_name: Name of the course
             topics: Comma-separated topics covered
             level: Course level (Beginner/Intermediate/Advanced)
+            regenerate: Skip the response cache and replace the cached answer
         
         Returns:
             Generated description or None if failed
@@ -159,9 +256,11 @@ Requirements:
 Generate only the description, no additional text.
         """
         
-        return await self._call_api(prompt)
+        return await self._generate(prompt, regenerate)
     
-    async def generate_promotional_message(self, course_name: str, price: float, discount: int = 0) -> Optional[str]:
+    @tracked
+    async def generate_promotional_message(self, course_name: str, price: float, discount: int = 0,
+                                           regenerate: bool = False) -> Optional[str]:
         """
         Generate promotional message for course
         
@@ -169,6 +268,7 @@ Generate only the description, no additional text.
             course_name: Name of the course
             price: Course price in INR
             discount: Discount percentage (0-100)
+            regenerate: Skip the response cache and replace the cached answer
         
         Returns:
             Generated promotional message or None
@@ -197,8 +297,9 @@ Requirements:
 Generate only the promotional message.
         """
         
-        return await self._call_api(prompt)
+        return await self._generate(prompt, regenerate)
     
+    @tracked
     async def generate_broadcast_message(self, content: str, message_type: str = "general") -> Optional[str]:
         """
         Generate broadcast message for users
@@ -232,13 +333,15 @@ Generate only the message.
         
         return await self._call_api(prompt)
     
-    async def generate_faq(self, course_name: str, topics: str) -> Optional[str]:
+    @tracked
+    async def generate_faq(self, course_name: str, topics: str, regenerate: bool = False) -> Optional[str]:
         """
         Generate FAQ for a course
         
         Args:
             course_name: Course name
             topics: Course topics
+            regenerate: Skip the response cache and replace the cached answer
         
         Returns:
             Generated FAQ or None
@@ -270,15 +373,18 @@ A: Answer.
 Generate only the Q&A content.
         """
         
-        return await self._call_api(prompt)
+        return await self._generate(prompt, regenerate)
     
-    async def generate_email_template(self, purpose: str, recipient: str = "student") -> Optional[str]:
+    @tracked
+    async def generate_email_template(self, purpose: str, recipient: str = "student",
+                                      regenerate: bool = False) -> Optional[str]:
         """
         Generate email template
         
         Args:
             purpose: Email purpose (welcome/confirmation/reminder/etc)
             recipient: Who receives the email
+            regenerate: Skip the response cache and replace the cached answer
         
         Returns:
             Generated email template or None
@@ -314,15 +420,18 @@ Best regards,
 Generate the complete email template.
         """
         
-        return await self._call_api(prompt)
+        return await self._generate(prompt, regenerate)
     
-    async def brainstorm_course_ideas(self, category: str, target_audience: str = "students") -> Optional[str]:
+    @tracked
+    async def brainstorm_course_ideas(self, category: str, target_audience: str = "students",
+                                      regenerate: bool = False) -> Optional[str]:
         """
         Brainstorm course ideas for a category
         
         Args:
             category: Course category
             target_audience: Who the course is for
+            regenerate: Skip the response cache and replace the cached answer
         
         Returns:
             Brainstorming ideas or None
@@ -349,7 +458,7 @@ Format:
 Generate course ideas only.
         """
         
-        return await self._call_api(prompt)
+        return await self._generate(prompt, regenerate)
     
     async def _call_vision_api(self, text: str, image_url: str, stream: bool = False) -> Optional[str]:
         """
@@ -368,16 +477,105 @@ Generate course ideas only.
             logger.error("OpenRouter API key not configured")
             return None
         
-        headers = {
+        if stream:
+            try:
+                full_content = "".join([chunk async for chunk in self._stream_vision(text, image_url)])
+            except StreamInterrupted:
+                # A truncated answer is no answer
+                return None
+            if not full_content:
+                return None
+            logger.info(f"✅ Vision AI analysis successful (streaming)")
+            return full_content.strip()
+        
+        # Coalesce on the whole chain: any of its models may answer
+        key = ai_cache.make_key(','.join(self.models), text, {'image_url': image_url})
+        return await self._flights.do(key, lambda: self._post_vision(text, image_url, AIScheduler.INTERACTIVE))
+    
+    async def _post_vision(self, text: str, image_url: str, priority: int) -> Optional[str]:
+        """Non-streaming vision request along the model chain, see _call_vision_api"""
+        if not self.api_key:
+            logger.error("OpenRouter API key not configured")
+            return None
+        
+        image = await image_preprocessor.prepare(image_url)
+        if image is None:
+            logger.error("❌ Could not load image for vision API")
+            return None
+        return await model_router.run(
+            self.models, lambda model: self._post_vision_model(model, text, image, priority)
+        )
+    
+    async def _post_vision_model(self, model: str, text: str, image: str, priority: int) -> Optional[str]:
+        """One model's vision request, with 429 retries"""
+        payload = self._vision_payload(text, image, model)
+        
+        with ai_usage.call(model) as call:
+            for attempt in range(AIConfig.MAX_RETRIES):
+                call.retries = attempt
+                try:
+                    session = await http_session.get()
+                    async with ai_scheduler.slot(priority), model_router.timing(model) as timing, session.post(
+                        f"{self.api_base}/chat/completions",
+                        json=payload,
+                        headers=self._headers(),
+                        timeout=aiohttp.ClientTimeout(total=60)  # Vision takes longer
+                    ) as response:
+                        
+                        if response.status == 200:
+                            data = await response.json()
+                            content = data['choices'][0]['message']['content'].strip()
+                            ai_scheduler.succeeded()
+                            timing.succeeded()
+                            call.succeeded(data.get('usage'))
+                            logger.info(f"✅ Vision AI analysis successful (model: {model})")
+                            return content
+                        
+                        elif response.status == 429:
+                            ai_scheduler.rate_limited(ai_scheduler.parse_retry_after(response.headers.get('Retry-After')))
+                            call.status = 'rate_limited'
+                            logger.warning(f"⏱️ Rate limited on vision API (attempt {attempt + 1}/{AIConfig.MAX_RETRIES})")
+                            continue
+                        
+                        elif response.status == 401:
+                            logger.error("❌ Invalid API key for OpenRouter")
+                            return None
+                        
+                        else:
+                            error_text = await response.text()
+                            logger.error(f"❌ Vision API error {response.status}: {error_text}")
+                            return None
+                
+                except asyncio.TimeoutError:
+                    call.status = 'timeout'
+                    logger.error("⏱️ Vision API request timeout")
+                    return None
+                
+                except aiohttp.ClientError as e:
+                    logger.error(f"❌ Network error in vision API: {e}")
+                    return None
+                
+                except Exception as e:
+                    logger.error(f"❌ Unexpected error in vision API: {e}")
+                    return None
+            
+            logger.error(f"❌ Vision API still rate limited after {AIConfig.MAX_RETRIES} attempts")
+            return None
+    
+    def _headers(self) -> Dict:
+        """OpenRouter request headers"""
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "HTTP-Referer": "https://github.com/alexavik/Botavik",
             "X-Title": "Botavik Course Bot",
             "Content-Type": "application/json"
         }
-        
-        # Multimodal payload (text + image)
-        payload = {
-            "model": self.model,  # google/gemini-2.0-flash-exp:free supports vision
+    
+    def _vision_payload(self, text: str, image_url: str, model: Optional[str] = None) -> Dict:
+        """Multimodal payload (text + image, image_url is normally an inline data: URL)"""
+        return {
+            "model": model or self.model,  # google/gemini-2.0-flash-exp:free supports vision
+            "usage": {"include": True},
             "messages": [
                 {
                     "role": "user",
@@ -394,113 +592,284 @@ Generate course ideas only.
                         }
                     ]
                 }
+            ]
+        }
+    
+    # ==================== STREAMING ====================
+    
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream a text generation as it is produced
+        
+        Args:
+            prompt: The prompt to send to AI
+        
+        Yields:
+            Text chunks in order; nothing at all if the call failed
+        """
+        if not self.enabled or not self.api_key:
+            return
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
             ],
-            "stream": stream
+            **self._sampling_params()
         }
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
+        async for chunk in self._stream_completion(payload, timeout=AIConfig.API_TIMEOUT, method='generate_stream'):
+            yield chunk
+    
+    async def analyze_image_stream(self, image_url: str, question: str = "What is in this image?") -> AsyncIterator[str]:
+        """
+        Stream an image analysis (see analyze_image)
+        
+        Yields:
+            Text chunks in order; nothing at all if the call failed
+        """
+        if not self.enabled or not self.api_key:
+            return
+        
+        logger.info(f"🖼️ Analyzing image (streaming): {describe_image_url(image_url)}")
+        
+        async for chunk in self._stream_vision(question, image_url, 'analyze_image_stream'):
+            yield chunk
+    
+    async def analyze_course_thumbnail_stream(self, image_url: str, course_name: str) -> AsyncIterator[str]:
+        """
+        Stream a course thumbnail review (see analyze_course_thumbnail)
+        
+        Yields:
+            Text chunks in order; nothing at all if the call failed
+        """
+        if not self.enabled or not self.api_key:
+            return
+        
+        async for chunk in self._stream_vision(self._thumbnail_prompt(course_name), image_url,
+                                               'analyze_course_thumbnail_stream'):
+            yield chunk
+    
+    async def _stream_vision(self, text: str, image_url: str, method: Optional[str] = None) -> AsyncIterator[str]:
+        """Preprocess the image, then stream the vision answer"""
+        image = await image_preprocessor.prepare(image_url)
+        if image is None:
+            logger.error("❌ Could not load image for vision API")
+            return
+        
+        async for chunk in self._stream_completion(self._vision_payload(text, image), timeout=60, method=method):
+            yield chunk
+    
+    async def _stream_completion(self, payload: Dict, timeout: float,
+                                 priority: int = AIScheduler.INTERACTIVE,
+                                 method: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        POST a chat completion with stream=True and yield content deltas
+        
+        `timeout` bounds the wait for each chunk rather than the whole
+        generation, so long answers are not cut off while tokens keep coming.
+        The scheduler slot is held until the stream ends. A 429 (nothing
+        yielded yet) is retried after the shared backoff. A model that fails
+        before yielding anything hands over to the next model in the chain;
+        streams are not hedged, since two half-written answers can't be merged.
+        """
+        for model in self.models:
+            payload = {**payload, "model": model}
+            produced = False
+            
+            for attempt in range(AIConfig.MAX_RETRIES):
+                rate_limited = False
+                # Run each attempt to completion so its slot is released right away
+                async for chunk in self._stream_attempt(payload, timeout, priority, method):
+                    if chunk is None:
+                        rate_limited = True
+                    else:
+                        produced = True
+                        yield chunk
+                if not rate_limited:
+                    break
+            else:
+                logger.error(f"❌ Streaming API still rate limited after {AIConfig.MAX_RETRIES} attempts")
+                return
+            
+            if produced:
+                return
+            if model != self.models[-1]:
+                logger.warning(f"🔀 Streaming with {model} failed, falling back to the next model")
+    
+    async def _stream_attempt(self, payload: Dict, timeout: float, priority: int,
+                              method: Optional[str]) -> AsyncIterator[Optional[str]]:
+        """
+        One streaming request; yields None once if it was rate limited
+        
+        Raises:
+            StreamInterrupted: The stream broke off (timeout, network error,
+            no end marker) after content had been yielded
+        """
+        produced = finished = False
+        
+        with ai_usage.call(payload['model'], method) as call:
+            try:
+                session = await http_session.get()
+                async with ai_scheduler.slot(priority), session.post(
                     f"{self.api_base}/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=60)  # Vision takes longer
+                    json={**payload, "stream": True, "usage": {"include": True}},
+                    headers=self._headers(),
+                    timeout=aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
                 ) as response:
                     
-                    if response.status == 200:
-                        if stream:
-                            # Handle streaming response
-                            full_content = ""
-                            async for line in response.content:
-                                if line:
-                                    try:
-                                        line_text = line.decode('utf-8').strip()
-                                        if line_text.startswith('data: '):
-                                            json_str = line_text[6:]
-                                            if json_str != '[DONE]':
-                                                chunk = json.loads(json_str)
-                                                content = chunk.get('choices', [{}])[0].get('delta', {}).get('content', '')
-                                                if content:
-                                                    full_content += content
-                                    except Exception as e:
-                                        continue
-                            logger.info(f"✅ Vision AI analysis successful (streaming)")
-                            return full_content.strip()
-                        else:
-                            # Handle non-streaming response
-                            data = await response.json()
-                            content = data['choices'][0]['message']['content'].strip()
-                            logger.info(f"✅ Vision AI analysis successful")
-                            return content
+                    if response.status == 429:
+                        ai_scheduler.rate_limited(ai_scheduler.parse_retry_after(response.headers.get('Retry-After')))
+                        call.status = 'rate_limited'
+                        logger.warning("⏱️ Rate limited on streaming API")
+                        yield None
+                        return
                     
-                    elif response.status == 429:
-                        logger.warning("⏱️ Rate limited on vision API")
-                        return None
+                    if response.status != 200:
+                        error_text = await response.text()
+                        logger.error(f"❌ Streaming API error {response.status}: {error_text}")
+                        return
                     
-                    elif response.status == 401:
-                        logger.error("❌ Invalid API key for OpenRouter")
-                        return None
+                    # Server-sent events: "data: {json}" lines, ": comment" keep-alives
+                    async for line in response.content:
+                        line_text = line.decode('utf-8').strip()
+                        if not line_text.startswith('data: '):
+                            continue
+                        
+                        json_str = line_text[6:]
+                        if json_str == '[DONE]':
+                            finished = True
+                            break
+                        
+                        try:
+                            chunk = json.loads(json_str)
+                        except json.JSONDecodeError:
+                            continue
+                        
+                        # The final chunk carries the usage totals
+                        call.add_usage(chunk.get('usage'))
+                        
+                        choice = (chunk.get('choices') or [{}])[0]
+                        finished = finished or bool(choice.get('finish_reason'))
+                        content = choice.get('delta', {}).get('content')
+                        if content:
+                            produced = True
+                            yield content
                     
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"❌ Vision API error {response.status}: {error_text}")
-                        return None
+                    call.status = 'ok' if finished or not produced else 'interrupted'
+            
+            except asyncio.TimeoutError:
+                call.status = 'timeout'
+                logger.error("⏱️ Streaming API request timeout")
+            
+            except aiohttp.ClientError as e:
+                logger.error(f"❌ Network error in streaming API: {e}")
         
-        except asyncio.TimeoutError:
-            logger.error("⏱️ Vision API request timeout")
-            return None
+        if produced and not finished:
+            logger.warning("⚠️ Stream broke off mid-answer")
+            raise StreamInterrupted()
+    
+    def _sampling_params(self) -> Dict:
+        """Sampling parameters sent with every text generation"""
+        return {
+            "temperature": AIConfig.TEMPERATURE,
+            "top_p": AIConfig.TOP_P,
+            "max_tokens": AIConfig.MAX_TOKENS,
+            "top_k": 40,
+            "frequency_penalty": 0.5,
+            "presence_penalty": 0.5
+        }
+    
+    async def _generate(self, prompt: str, regenerate: bool = False) -> Optional[str]:
+        """
+        Text generation through the response cache
         
-        except aiohttp.ClientError as e:
-            logger.error(f"❌ Network error in vision API: {e}")
-            return None
+        Args:
+            prompt: The prompt to send to AI
+            regenerate: Skip the cache lookup, the new answer replaces the cached one
         
-        except Exception as e:
-            logger.error(f"❌ Unexpected error in vision API: {e}")
-            return None
+        Returns:
+            Generated content or None if failed
+        """
+        key = ai_cache.make_key(self.model, prompt, self._sampling_params())
+        
+        if not regenerate:
+            cached = await ai_cache.get(key)
+            if cached is not None:
+                logger.info("⚡ AI response served from cache")
+                return cached
+        
+        # A regenerate must not be answered by a plain request already in flight
+        flight_key = f"{key}:regenerate" if regenerate else key
+        return await self._flights.do(flight_key, lambda: self._generate_and_cache(key, prompt, regenerate))
     
-    async def _call_api(self, prompt: str, max_retries: int = 3) -> Optional[str]:
+    async def _generate_and_cache(self, key: str, prompt: str, replace: bool) -> Optional[str]:
+        model, content = await self._route_api(prompt)
+        if model == self.model:
+            await ai_cache.put(key, model, content, replace=replace)
+        elif content is not None:
+            # The key names the primary model, a fallback's answer must not pass for it
+            logger.info(f"🔀 Not caching answer from secondary model {model}")
+        return content
+    
+    async def _call_api(self, prompt: str, max_retries: int = 3,
+                        priority: int = AIScheduler.NORMAL) -> Optional[str]:
         """
         Make API call to OpenRouter with retry logic
         
+        Each attempt waits for an ai_scheduler slot; a 429 pauses every
+        caller for the shared backoff window before the retry. The call runs
+        along the model chain through model_router: fallback models take
+        over on failure and are hedged to when the primary is slow.
+        
         Args:
             prompt: The prompt to send to AI
-            max_retries: Maximum number of retry attempts
+            max_retries: Maximum number of retry attempts per model
+            priority: ai_scheduler priority class
         
         Returns:
             Generated content or None if failed
         """
         
+        _, content = await self._route_api(prompt, max_retries, priority)
+        return content
+    
+    async def _route_api(self, prompt: str, max_retries: int = 3,
+                         priority: int = AIScheduler.NORMAL) -> Tuple[Optional[str], Optional[str]]:
+        """_call_api returning (model that answered, content)"""
         if not self.api_key:
             logger.error("OpenRouter API key not configured")
-            return None
+            return None, None
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://github.com/alexavik/Botavik",
-            "X-Title": "Botavik Course Bot",
-            "Content-Type": "application/json"
-        }
+        return await model_router.route(
+            self.models, lambda model: self._call_model(model, prompt, max_retries, priority)
+        )
+    
+    async def _call_model(self, model: str, prompt: str, max_retries: int, priority: int) -> Optional[str]:
+        """One model's text generation with retries, see _call_api"""
+        headers = self._headers()
         
         payload = {
-            "model": self.model,
+            "model": model,
             "messages": [
                 {
                     "role": "user",
                     "content": prompt
                 }
             ],
-            "temperature": AIConfig.TEMPERATURE,
-            "top_p": AIConfig.TOP_P,
-            "max_tokens": AIConfig.MAX_TOKENS,
-            "top_k": 40,
-            "frequency_penalty": 0.5,
-            "presence_penalty": 0.5
+            **self._sampling_params(),
+            "usage": {"include": True}  # token counts and cost for ai_usage
         }
         
-        for attempt in range(max_retries):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
+        with ai_usage.call(model) as call:
+            for attempt in range(max_retries):
+                call.retries = attempt
+                try:
+                    session = await http_session.get()
+                    async with ai_scheduler.slot(priority), model_router.timing(model) as timing, session.post(
                         f"{self.api_base}/chat/completions",
                         json=payload,
                         headers=headers,
@@ -510,14 +879,18 @@ Generate course ideas only.
                         if response.status == 200:
                             data = await response.json()
                             content = data['choices'][0]['message']['content'].strip()
-                            logger.info(f"✅ AI generation successful (model: {self.model})")
+                            ai_scheduler.succeeded()
+                            timing.succeeded()
+                            call.succeeded(data.get('usage'))
+                            logger.info(f"✅ AI generation successful (model: {model})")
                             return content
                         
                         elif response.status == 429:
+                            # Shared backoff: the retry queues until the window passes
+                            ai_scheduler.rate_limited(ai_scheduler.parse_retry_after(response.headers.get('Retry-After')))
+                            call.status = 'rate_limited'
                             logger.warning(f"⏱️ Rate limited, retrying... (attempt {attempt + 1}/{max_retries})")
-                            if attempt < max_retries - 1:
-                                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                                continue
+                            continue
                         
                         elif response.status == 401:
                             logger.error("❌ Invalid API key for OpenRouter")
@@ -527,30 +900,32 @@ Generate course ideas only.
                             error_text = await response.text()
                             logger.error(f"❌ API error {response.status}: {error_text}")
                             return None
+                
+                except asyncio.TimeoutError:
+                    call.status = 'timeout'
+                    logger.warning(f"⏱️ Request timeout, retrying... (attempt {attempt + 1}/{max_retries})")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                
+                except aiohttp.ClientError as e:
+                    logger.error(f"❌ Network error: {e}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+                
+                except json.JSONDecodeError as e:
+                    logger.error(f"❌ Invalid JSON response: {e}")
+                    return None
+                
+                except Exception as e:
+                    logger.error(f"❌ Unexpected error in AI generation: {e}")
+                    return None
             
-            except asyncio.TimeoutError:
-                logger.warning(f"⏱️ Request timeout, retrying... (attempt {attempt + 1}/{max_retries})")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)
-                    continue
-            
-            except aiohttp.ClientError as e:
-                logger.error(f"❌ Network error: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)
-                    continue
-            
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Invalid JSON response: {e}")
-                return None
-            
-            except Exception as e:
-                logger.error(f"❌ Unexpected error in AI generation: {e}")
-                return None
-        
-        logger.error(f"❌ AI generation failed after {max_retries} attempts")
-        return None
+            logger.error(f"❌ AI generation failed after {max_retries} attempts")
+            return None
     
+    @tracked
     async def test_connection(self) -> bool:
         """
         Test OpenRouter API connection
@@ -572,6 +947,7 @@ Generate course ideas only.
             logger.error("❌ OpenRouter AI connection failed")
             return False
     
+    @tracked
     async def test_vision(self, test_image_url: str = "https://upload.wikimedia.org/wikipedia/commons/thumb/d/dd/Gfp-wisconsin-madison-the-nature-boardwalk.jpg/2560px-Gfp-wisconsin-madison-the-nature-boardwalk.jpg") -> bool:
         """
         Test vision API with a sample image
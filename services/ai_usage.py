@@ -0,0 +1,253 @@
+# 📈 AI Usage Accounting - Latency, tokens, errors and cost of every OpenRouter call
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from config import AIConfig
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the in-memory latency histogram buckets, the last one is open-ended
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+COLUMNS = ('created_at', 'method', 'model', 'latency_ms', 'tokens_in', 'tokens_out', 'retries', 'status', 'cost')
+
+# AIService method the current call is made for, see tracked()
+_current_method: contextvars.ContextVar[str] = contextvars.ContextVar('ai_usage_method', default='other')
+
+
+def tracked(func):
+    """Label every API call made inside an AIService coroutine with its name"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = _current_method.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _current_method.reset(token)
+    return wrapper
+
+
+class UsageCall:
+    """One model call being measured, filled in by the caller"""
+    
+    def __init__(self, model: str, method: str):
+        self.model = model
+        self.method = method
+        self.status = 'error'
+        self.retries = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.cost: Optional[float] = None
+    
+    def succeeded(self, usage: Optional[Dict]):
+        """Mark the call successful with the response's `usage` field"""
+        self.status = 'ok'
+        self.add_usage(usage)
+    
+    def add_usage(self, usage: Optional[Dict]):
+        if not usage:
+            return
+        self.tokens_in = usage.get('prompt_tokens') or 0
+        self.tokens_out = usage.get('completion_tokens') or 0
+        if usage.get('cost') is not None:
+            self.cost = float(usage['cost'])
+
+
+class AIUsageRecorder:
+    """
+    Account for every OpenRouter call
+    
+    Each call becomes one row of the compact ai_usage table (method, model,
+    latency, tokens in/out, retries, status, cost). Rows are buffered in
+    memory and written with COPY in batches of FLUSH_SIZE, or every
+    FLUSH_INTERVAL seconds, so accounting adds no round trip to a call.
+    Rows still buffered when a flush fails are kept for the next one.
+    
+    Cost comes from OpenRouter's usage.cost when the response has it and
+    is otherwise estimated from AIConfig.MODEL_PRICES.
+    
+    Per-method and per-model latency histograms and totals since start are
+    also kept in memory for get_stats().
+    
+    Usage:
+        with ai_usage.call(model) as call:
+            call.retries = attempt
+            ...
+            call.succeeded(data.get('usage'))
+    """
+    
+    def __init__(self):
+        self.flush_size = AIConfig.USAGE_FLUSH_SIZE
+        self.flush_interval = AIConfig.USAGE_FLUSH_INTERVAL
+        self._buffer: List[Tuple] = []
+        self._histograms: Dict[Tuple[str, str], List[int]] = {}
+        self._totals: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Task] = None
+    
+    @contextmanager
+    def call(self, model: str, method: Optional[str] = None):
+        """Measure one model call (including its retries) and record it on exit"""
+        call = UsageCall(model, method or _current_method.get())
+        started = time.monotonic()
+        try:
+            yield call
+        except (asyncio.CancelledError, GeneratorExit):
+            # Hedge losers and abandoned streams
+            call.status = 'cancelled'
+            raise
+        except Exception:
+            call.status = 'error'
+            raise
+        finally:
+            self.record(call, int((time.monotonic() - started) * 1000))
+    
+    def record(self, call: UsageCall, latency_ms: int):
+        cost = call.cost if call.cost is not None else self.estimate_cost(call.model, call.tokens_in, call.tokens_out)
+        self._buffer.append((
+            datetime.now(timezone.utc), call.method[:40], call.model[:100], latency_ms,
+            call.tokens_in, call.tokens_out, call.retries, call.status, cost
+        ))
+        
+        for key in ((call.method, '*'), ('*', call.model)):
+            histogram = self._histograms.setdefault(key, [0] * (len(LATENCY_BUCKETS_MS) + 1))
+            histogram[self._bucket(latency_ms)] += 1
+        
+        totals = self._totals.setdefault(call.model, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'tokens_in': 0, 'tokens_out': 0, 'cost': 0.0
+        })
+        totals['calls'] += 1
+        totals['errors'] += call.status not in ('ok', 'cancelled')
+        totals['retries'] += call.retries
+        totals['tokens_in'] += call.tokens_in
+        totals['tokens_out'] += call.tokens_out
+        totals['cost'] += cost
+        
+        if len(self._buffer) >= self.flush_size and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.get_running_loop().create_task(self.flush())
+    
+    @staticmethod
+    def estimate_cost(model: str, tokens_in: int, tokens_out: int) -> float:
+        """USD from AIConfig.MODEL_PRICES (per million tokens), 0 for unpriced models"""
+        price_in, price_out = AIConfig.MODEL_PRICES.get(model, (0.0, 0.0))
+        return (tokens_in * price_in + tokens_out * price_out) / 1_000_000
+    
+    @staticmethod
+    def _bucket(latency_ms: int) -> int:
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                return index
+        return len(LATENCY_BUCKETS_MS)
+    
+    async def flush(self):
+        """Write buffered rows with one COPY"""
+        if not self._buffer or db.pool is None:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            # Straight from the pool: flushes run in tasks spawned inside handlers'
+            # units of work, which may already be released
+            async with db.pool.acquire() as connection:
+                await connection.copy_records_to_table('ai_usage', records=batch, columns=COLUMNS)
+        except Exception as e:
+            logger.error(f"Error writing AI usage records: {e}")
+            # Keep them for the next flush, but don't grow without bound while the DB is down
+            self._buffer = (batch + self._buffer)[-self.flush_size * 20:]
+    
+    async def start(self):
+        """Start the periodic flush"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the periodic flush and write what is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    async def get_daily(self, days: int = 7) -> List[Dict]:
+        """
+        Daily totals for the last `days` days, newest first
+        
+        Returns:
+            [{'day', 'calls', 'errors', 'retries', 'tokens_in', 'tokens_out', 'cost', 'p95_ms'}]
+        """
+        await self.flush()
+        try:
+            rows = await db.fetch(
+                """SELECT created_at::date AS day,
+                          COUNT(*) AS calls,
+                          COUNT(*) FILTER (WHERE status NOT IN ('ok', 'cancelled')) AS errors,
+                          COALESCE(SUM(retries), 0) AS retries,
+                          COALESCE(SUM(tokens_in), 0) AS tokens_in,
+                          COALESCE(SUM(tokens_out), 0) AS tokens_out,
+                          COALESCE(SUM(cost), 0) AS cost,
+                          percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms)
+                              FILTER (WHERE status = 'ok') AS p95_ms
+                   FROM ai_usage
+                   WHERE created_at >= CURRENT_DATE - ($1::INT - 1)
+                   GROUP BY day
+                   ORDER BY day DESC""",
+                days
+            )
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting AI usage: {e}")
+            return []
+    
+    async def get_method_latency(self) -> List[Dict]:
+        """Today's calls and p95 latency per method"""
+        await self.flush()
+        try:
+            rows = await db.fetch(
+                """SELECT method, COUNT(*) AS calls,
+                          percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms)
+                              FILTER (WHERE status = 'ok') AS p95_ms
+                   FROM ai_usage
+                   WHERE created_at >= CURRENT_DATE
+                   GROUP BY method
+                   ORDER BY calls DESC"""
+            )
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting AI latency: {e}")
+            return []
+    
+    def get_stats(self) -> Dict:
+        """In-memory totals per model and histogram p95 per method/model since start"""
+        def p95(histogram: List[int]) -> Optional[int]:
+            target = sum(histogram) * 0.95
+            seen = 0
+            for index, count in enumerate(histogram):
+                seen += count
+                if seen >= target and count:
+                    return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+            return None
+        
+        return {
+            'models': {model: dict(totals) for model, totals in self._totals.items()},
+            'p95_ms_by_method': {key[0]: p95(h) for key, h in self._histograms.items() if key[1] == '*'},
+            'p95_ms_by_model': {key[1]: p95(h) for key, h in self._histograms.items() if key[0] == '*'},
+            'buffered': len(self._buffer)
+        }
+
+
+# Global AI usage recorder instance
+ai_usage = AIUsageRecorder()
@@ -0,0 +1,240 @@
+# 🔁 Caption Refresh Job - Bulk ai_caption regeneration with DB checkpoints
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from telegram import Bot
+from telegram.error import TelegramError
+from config import AIConfig
+from database.db import db
+from handlers.ai_generator import request_caption
+from services.ai_scheduler import AIScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class CaptionJobRunner:
+    """
+    Regenerate ai_caption for many courses in one background job
+    
+    Courses are walked in id order, BATCH_SIZE at a time. Each batch runs
+    its AI calls in parallel (CONCURRENCY at once, at the scheduler's bulk
+    priority so interactive requests still go first), then writes every
+    new caption with one UPDATE ... FROM unnest and advances the job's
+    checkpoint (last_course_id, counters) in the same transaction.
+    
+    A job interrupted by a restart is picked up from its checkpoint by
+    resume(). Progress is reported by editing one Telegram message, whose
+    ids are stored with the job so a resumed job keeps updating it.
+    Failed generations keep their old caption and are counted as failed.
+    """
+    
+    def __init__(self):
+        self.concurrency = AIConfig.CAPTION_JOB_CONCURRENCY
+        self.batch_size = AIConfig.CAPTION_JOB_BATCH_SIZE
+        self._task: Optional[asyncio.Task] = None
+    
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self, bot: Bot, limit: Optional[int], started_by: int,
+                    chat_id: int, message_id: int) -> Optional[Dict]:
+        """
+        Start a job for the first `limit` courses (None = all)
+        
+        Returns:
+            The job row, or None if a job is already running or it failed to start
+        """
+        if self.is_running():
+            return None
+        
+        try:
+            job = await db.fetchrow(
+                """INSERT INTO caption_jobs (total, started_by, report_chat_id, report_message_id)
+                   SELECT LEAST(COUNT(*), COALESCE($1, COUNT(*))), $2, $3, $4
+                   FROM courses WHERE deleted_at IS NULL
+                   RETURNING *""",
+                limit, started_by, chat_id, message_id
+            )
+        except Exception as e:
+            logger.error(f"Error starting caption job: {e}")
+            return None
+        
+        logger.info(f"🔁 Caption job #{job['id']} started for {job['total']} courses")
+        self._task = asyncio.create_task(self._run(bot, dict(job)))
+        return dict(job)
+    
+    async def resume(self, bot: Bot):
+        """Continue a job a restart interrupted"""
+        if self.is_running():
+            return
+        
+        try:
+            job = await db.fetchrow(
+                "SELECT * FROM caption_jobs WHERE status = 'running' ORDER BY id DESC LIMIT 1"
+            )
+        except Exception as e:
+            logger.error(f"Error loading caption job: {e}")
+            return
+        
+        if job:
+            logger.info(f"🔁 Resuming caption job #{job['id']} at course {job['last_course_id']}")
+            self._task = asyncio.create_task(self._run(bot, dict(job)))
+    
+    async def cancel(self) -> bool:
+        """Cancel the running job for good (resume() will not pick it up)"""
+        if not self.is_running():
+            return False
+        await self._stop_task()
+        await db.execute(
+            """UPDATE caption_jobs SET status = 'cancelled', finished_at = NOW(), updated_at = NOW()
+               WHERE status = 'running'"""
+        )
+        return True
+    
+    async def stop(self):
+        """Stop for shutdown; the job stays 'running' and resumes on next start"""
+        await self._stop_task()
+    
+    async def _stop_task(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def get_latest(self) -> Optional[Dict]:
+        """Most recent job"""
+        try:
+            job = await db.fetchrow("SELECT * FROM caption_jobs ORDER BY id DESC LIMIT 1")
+            return dict(job) if job else None
+        except Exception as e:
+            logger.error(f"Error getting caption job: {e}")
+            return None
+    
+    async def _run(self, bot: Bot, job: Dict):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+        processed_here = 0
+        status = 'done'
+        
+        try:
+            while job['done'] + job['failed'] < job['total']:
+                remaining = job['total'] - job['done'] - job['failed']
+                courses = await db.fetch(
+                    """SELECT id, title, description, price FROM courses
+                       WHERE deleted_at IS NULL AND id > $1
+                       ORDER BY id LIMIT $2""",
+                    job['last_course_id'], min(self.batch_size, remaining)
+                )
+                if not courses:
+                    break
+                
+                captions = await asyncio.gather(*(self._caption(semaphore, course) for course in courses))
+                job = await self._checkpoint(job['id'], courses, captions)
+                processed_here += len(courses)
+                
+                rate = processed_here / (time.monotonic() - started)
+                await self._report(bot, job, rate)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in caption job #{job['id']}: {e}")
+            status = 'failed'
+        
+        try:
+            row = await db.fetchrow(
+                """UPDATE caption_jobs SET status = $2, finished_at = NOW(), updated_at = NOW()
+                   WHERE id = $1 RETURNING *""",
+                job['id'], status
+            )
+            job = dict(row) if row else job
+        except Exception as e:
+            logger.error(f"Error finishing caption job #{job['id']}: {e}")
+        
+        logger.info(f"✅ Caption job #{job['id']} {status}: {job['done']} updated, {job['failed']} failed")
+        await self._report(bot, job, 0.0)
+    
+    async def _caption(self, semaphore: asyncio.Semaphore, course) -> Optional[str]:
+        async with semaphore:
+            return await request_caption(
+                course['title'], course['description'], float(course['price']),
+                priority=AIScheduler.BULK
+            )
+    
+    async def _checkpoint(self, job_id: int, courses: List, captions: List[Optional[str]]) -> Dict:
+        """Write a batch of captions and advance the checkpoint atomically"""
+        ids = [course['id'] for course, caption in zip(courses, captions) if caption]
+        texts = [caption for caption in captions if caption]
+        
+        async with db.transaction() as connection:
+            if ids:
+                await connection.execute(
+                    """UPDATE courses SET ai_caption = batch.caption, updated_at = NOW()
+                       FROM unnest($1::INT[], $2::TEXT[]) AS batch(id, caption)
+                       WHERE courses.id = batch.id""",
+                    ids, texts
+                )
+            job = await connection.fetchrow(
+                """UPDATE caption_jobs
+                   SET done = done + $2, failed = failed + $3, last_course_id = $4, updated_at = NOW()
+                   WHERE id = $1 RETURNING *""",
+                job_id, len(ids), len(courses) - len(ids), courses[-1]['id']
+            )
+        
+        if ids:
+            # One invalidation for the batch instead of one per course
+            await db.invalidation.publish('courses')
+        return dict(job)
+    
+    async def _report(self, bot: Bot, job: Dict, rate: float):
+        if not job.get('report_chat_id') or not job.get('report_message_id'):
+            return
+        try:
+            await bot.edit_message_text(
+                format_progress(job, rate),
+                chat_id=job['report_chat_id'],
+                message_id=job['report_message_id']
+            )
+        except TelegramError as e:
+            # "message is not modified" and deleted report messages are harmless
+            logger.debug(f"Caption job report not updated: {e}")
+
+
+def format_progress(job: Dict, rate: float = 0.0) -> str:
+    """Progress report for a caption job row"""
+    processed = job['done'] + job['failed']
+    total = job['total'] or 0
+    pct = processed / total * 100 if total else 100.0
+    filled = int(pct // 10)
+    bar = "▓" * filled + "░" * (10 - filled)
+    
+    status_labels = {
+        'running': "⏳ Running",
+        'done': "✅ Finished",
+        'failed': "❌ Failed",
+        'cancelled': "🛑 Cancelled"
+    }
+    
+    lines = [
+        f"🔁 CAPTION REFRESH #{job['id']}",
+        "",
+        f"{bar} {pct:.0f}%",
+        f"📊 Progress: {processed}/{total} courses",
+        f"✅ Updated: {job['done']}",
+        f"❌ Failed: {job['failed']}",
+        f"📌 Status: {status_labels.get(job['status'], job['status'])}"
+    ]
+    
+    if job['status'] == 'running' and rate > 0:
+        eta = (total - processed) / rate
+        lines.append(f"⚡ Speed: {rate * 60:.0f} courses/min, ~{eta / 60:.1f} min left")
+    
+    return "\n".join(lines)
+
+
+# Global caption job runner instance
+caption_job_runner = CaptionJobRunner()
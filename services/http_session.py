@@ -0,0 +1,55 @@
+# 🌐 Shared HTTP Session - One pooled aiohttp session per process
+
+import logging
+from typing import Optional
+import aiohttp
+from config import AIConfig
+
+logger = logging.getLogger(__name__)
+
+
+class HttpSession:
+    """
+    Long-lived aiohttp.ClientSession shared by every AI call site
+    
+    A session per request pays TCP + TLS setup to openrouter.ai on every
+    call. This one keeps connections alive between calls, caps the pool
+    and caches DNS. main.post_init opens it and post_shutdown closes it;
+    get() opens it lazily for scripts that never run the bot lifecycle.
+    """
+    
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def start(self):
+        """Open the session (no-op if already open)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=AIConfig.HTTP_POOL_SIZE,
+                limit_per_host=AIConfig.HTTP_POOL_SIZE,
+                keepalive_timeout=AIConfig.HTTP_KEEPALIVE,
+                ttl_dns_cache=AIConfig.HTTP_DNS_TTL,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=AIConfig.API_TIMEOUT)
+            )
+            logger.info(f"✅ HTTP session opened (pool: {AIConfig.HTTP_POOL_SIZE})")
+    
+    async def get(self) -> aiohttp.ClientSession:
+        """The shared session; per-request timeouts still override the default"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+    
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info("✅ HTTP session closed")
+        self._session = None
+
+
+# Global HTTP session instance
+http_session = HttpSession()
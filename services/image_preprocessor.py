@@ -0,0 +1,217 @@
+# 🖼️ Image Preprocessor - Download, downscale and inline images for vision calls
+
+import asyncio
+import base64
+import io
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+import aiohttp
+from config import AIConfig
+from services.http_session import http_session
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow missing: images are inlined as downloaded
+    Image = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+
+def is_telegram_file_url(image_url: str) -> bool:
+    """Whether the URL is a Telegram Bot API file download (an uploaded photo)"""
+    parts = urlsplit(image_url)
+    return parts.scheme == 'https' and parts.hostname == 'api.telegram.org' and parts.path.startswith('/file/bot')
+
+
+def describe_image_url(image_url: str) -> str:
+    """Short label for logs and replies; Telegram file URLs embed the bot token"""
+    if '/file/bot' in image_url:
+        return "Telegram upload"
+    return f"{image_url[:50]}..." if len(image_url) > 50 else image_url
+
+
+class ImagePreprocessor:
+    """
+    Turn an image URL into a compact inline data URL for the vision model
+    
+    Only Telegram uploads are handled here: they are downloaded once over
+    the shared HTTP session, so their URLs (which embed the bot token) stay
+    private and the model doesn't pull a full-resolution photo. Any other
+    URL is user-supplied and passed to OpenRouter unchanged; the bot never
+    fetches it, so it can't be pointed at localhost or internal addresses.
+    Decoding, downscaling to VISION_MAX_SIDE and re-encoding (JPEG/WebP)
+    run in the default thread pool to keep the event loop free.
+    
+    Recently prepared images are kept in a small LRU (bounded by entries and
+    by total size), so asking a second question about the same image costs
+    no download.
+    """
+    
+    CACHE_SIZE = 32
+    CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    def __init__(self):
+        self.max_side = AIConfig.VISION_MAX_SIDE
+        self.format = AIConfig.VISION_IMAGE_FORMAT.upper()
+        self.quality = AIConfig.VISION_IMAGE_QUALITY
+        self.max_download = AIConfig.VISION_MAX_DOWNLOAD_MB * 1024 * 1024
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_bytes = 0
+        
+        if Image is None:
+            logger.warning("⚠️ Pillow not installed, vision images are sent without downscaling")
+    
+    async def prepare(self, image_url: str) -> Optional[str]:
+        """
+        Download and shrink an image
+        
+        Returns:
+            data: URL ready for an image_url content part (other than
+            Telegram uploads, URLs are returned unchanged), or None if the
+            image could not be downloaded or decoded
+        """
+        if image_url.startswith('data:') or not is_telegram_file_url(image_url):
+            return image_url
+        
+        cached = self._cache.get(image_url)
+        if cached is not None:
+            self._cache.move_to_end(image_url)
+            return cached
+        
+        downloaded = await self.download(image_url)
+        if downloaded is None:
+            return None
+        data, content_type = downloaded
+        
+        if Image is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                original_size = len(data)
+                data, content_type = await loop.run_in_executor(None, self._shrink, data)
+                logger.info(f"🖼️ Vision image {original_size // 1024} KB -> {len(data) // 1024} KB")
+            except Exception as e:
+                logger.error(f"Error preprocessing image: {e}")
+                return None
+        
+        data_url = f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+        self._remember(image_url, data_url)
+        return data_url
+    
+    async def download(self, image_url: str) -> Optional[Tuple[bytes, str]]:
+        """Fetch a Telegram file's bytes and content type, capped at VISION_MAX_DOWNLOAD_MB"""
+        if not is_telegram_file_url(image_url):
+            logger.error("❌ Refusing to download a non-Telegram image URL")
+            return None
+        
+        try:
+            session = await http_session.get()
+            async with session.get(image_url, timeout=aiohttp.ClientTimeout(total=30),
+                                   allow_redirects=False) as response:
+                if response.status != 200:
+                    logger.error(f"❌ Image download failed with status {response.status}")
+                    return None
+                
+                if (response.content_length or 0) > self.max_download:
+                    logger.error(f"❌ Image too large ({response.content_length} bytes)")
+                    return None
+                
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    data.extend(chunk)
+                    if len(data) > self.max_download:
+                        logger.error("❌ Image too large, download aborted")
+                        return None
+                
+                content_type = response.content_type if response.content_type.startswith('image/') else 'image/jpeg'
+                return bytes(data), content_type
+        
+        except asyncio.TimeoutError:
+            logger.error("⏱️ Image download timeout")
+        except aiohttp.ClientError as e:
+            # Never log the URL itself: Telegram file URLs contain the bot token
+            logger.error(f"❌ Network error downloading image: {type(e).__name__}")
+        return None
+    
+    async def fingerprint(self, image_url: str) -> Optional[int]:
+        """
+        64-bit difference hash (dHash) of a Telegram upload, None without
+        Pillow or for other URLs (the bot never downloads those)
+        
+        Computed from the prepared (downscaled) image, so the vision call
+        that may follow reuses the same download.
+        """
+        if Image is None or not is_telegram_file_url(image_url):
+            return None
+        
+        data_url = await self.prepare(image_url)
+        if data_url is None or not data_url.startswith('data:'):
+            return None
+        
+        data = base64.b64decode(data_url.split(',', 1)[1])
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, dhash, data)
+        except Exception as e:
+            logger.error(f"Error hashing image: {e}")
+            return None
+    
+    def _shrink(self, data: bytes) -> Tuple[bytes, str]:
+        """Decode, orient, downscale and re-encode (runs in a worker thread)"""
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            
+            if image.mode not in ('RGB', 'L'):
+                # Flatten transparency onto white, JPEG has no alpha
+                rgba = image.convert('RGBA')
+                image = Image.new('RGB', rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.split()[3])
+            
+            image.thumbnail((self.max_side, self.max_side), Image.LANCZOS)
+            
+            output = io.BytesIO()
+            if self.format == 'WEBP':
+                image.save(output, 'WEBP', quality=self.quality, method=4)
+            else:
+                image.save(output, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        
+        return output.getvalue(), MIME_TYPES.get(self.format, 'image/jpeg')
+    
+    def _remember(self, image_url: str, data_url: str):
+        if len(data_url) > self.CACHE_MAX_BYTES:
+            return
+        previous = self._cache.pop(image_url, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous)
+        
+        self._cache[image_url] = data_url
+        self._cache_bytes += len(data_url)
+        while len(self._cache) > self.CACHE_SIZE or self._cache_bytes > self.CACHE_MAX_BYTES:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+
+def dhash(data: bytes) -> int:
+    """
+    Difference hash: 9x8 grayscale thumbnail, one bit per horizontal
+    neighbour comparison. Re-encoding, resizing and light edits change only
+    a few of the 64 bits, so near-identical images have a small Hamming
+    distance.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+# Global image preprocessor instance
+image_preprocessor = ImagePreprocessor()
@@ -0,0 +1,373 @@
+# 👥 Channel Membership Service - Cached get_chat_member lookups for force join
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from telegram import Bot
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter, TelegramError
+from config import AppConfig, BotConfig
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the user is not in the chat
+NOT_MEMBER_STATUSES = ('left', 'kicked')
+
+# BadRequest messages about the channel itself rather than the user checked
+CHANNEL_ERROR_MESSAGES = (
+    'chat not found', 'member list is inaccessible', 'not enough rights',
+    'bot is not a member', 'chat_admin_required', 'channel_private'
+)
+
+
+def is_channel_error(error: Exception) -> bool:
+    """Whether a get_chat_member error means the channel is broken for everyone"""
+    if isinstance(error, (Forbidden, ChatMigrated)):
+        return True
+    if isinstance(error, BadRequest):
+        message = str(error).lower()
+        return any(text in message for text in CHANNEL_ERROR_MESSAGES)
+    return False
+
+
+class ChannelHealth:
+    """Failure tracking and circuit state for one force join channel"""
+    
+    __slots__ = ('failures', 'opened_until', 'last_error', 'alerted', 'timeout_users')
+    
+    def __init__(self):
+        self.failures = 0          # consecutive channel-level failures
+        self.timeout_users: Set[int] = set()  # distinct users whose checks timed out
+        self.opened_until = 0.0    # monotonic time the circuit stays open until
+        self.last_error: Optional[str] = None
+        self.alerted = False       # admins told about the current outage
+    
+    def state(self, threshold: int) -> str:
+        """'healthy', 'degraded', 'open' (paused) or 'half_open' (next call probes)"""
+        if self.opened_until > time.monotonic():
+            return 'open'
+        if self.failures >= threshold:
+            return 'half_open'
+        return 'degraded' if self.failures else 'healthy'
+
+
+class MembershipService:
+    """
+    Bounded TTL cache in front of Bot.get_chat_member
+    
+    Entries are keyed by (user_id, channel_id) and store the raw member
+    status, so each caller keeps its own rule for what counts as joined.
+    Positive results live for POSITIVE_TTL, "left"/"kicked" only for
+    NEGATIVE_TTL so a user who just joined is not locked out for long.
+    API errors are never cached.
+    
+    API calls from all users share one semaphore, which bounds the load
+    we put on Telegram's per-bot rate limits.
+    
+    Behind the cache sits the channel_memberships table, kept current by
+    chat_member updates for channels where the bot is an administrator.
+    get_chat_member is only the fallback for users no update was seen for
+    (recently). Recorded statuses expire after RECORD_TTL, since a missed
+    update (e.g. the bot lost admin rights) would otherwise pin them, and
+    every fresh API result overwrites the recorded row.
+    
+    Each channel has a circuit breaker: after BREAKER_THRESHOLD consecutive
+    channel-level failures (bot removed or demoted, channel deleted or
+    private) the channel is skipped for everyone during BREAKER_COOLDOWN
+    and admins get one alert. Errors about the user being checked don't
+    count, and a timeout only counts the first time it happens for each
+    user, so one slow lookup (or load) can't pause a channel; timeouts
+    keep counting only while they hit different users with no success in
+    between. The first call after the cool-down probes the channel again.
+    """
+    
+    def __init__(self, max_entries: int = None, positive_ttl: int = None, negative_ttl: int = None):
+        self.max_entries = max_entries or AppConfig.MEMBERSHIP_CACHE_SIZE
+        self.positive_ttl = AppConfig.MEMBERSHIP_POSITIVE_TTL if positive_ttl is None else positive_ttl
+        self.negative_ttl = AppConfig.MEMBERSHIP_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.record_ttl = AppConfig.MEMBERSHIP_RECORD_TTL
+        self._cache: "OrderedDict[Tuple[int, int], Tuple[str, float]]" = OrderedDict()
+        self._semaphore = asyncio.Semaphore(AppConfig.MEMBERSHIP_CHECK_CONCURRENCY)
+        self.timeout = AppConfig.MEMBERSHIP_CHECK_TIMEOUT
+        self.breaker_threshold = AppConfig.MEMBERSHIP_BREAKER_THRESHOLD
+        self.breaker_cooldown = AppConfig.MEMBERSHIP_BREAKER_COOLDOWN
+        self._health: Dict[int, ChannelHealth] = {}
+        self._alerts: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.recorded_hits = 0
+        self.misses = 0
+    
+    async def get_status(self, bot: Bot, user_id: int, channel_id: int, fresh: bool = False) -> str:
+        """
+        Get a user's member status in a channel
+        
+        Args:
+            bot: Bot used for the API call on a cache miss
+            user_id: Telegram user ID
+            channel_id: Channel/group ID
+            fresh: Skip the cache (e.g. "Verify" clicks) and refresh it
+        
+        Returns:
+            ChatMember status string ('member', 'left', 'kicked', ...)
+        
+        Raises:
+            TelegramError: API call failed (nothing is cached)
+        """
+        if not fresh:
+            status = self.get_cached(user_id, channel_id)
+            if status is not None:
+                self.hits += 1
+                return status
+        
+        self.misses += 1
+        member = await bot.get_chat_member(chat_id=channel_id, user_id=user_id)
+        self.set(user_id, channel_id, member.status)
+        return member.status
+    
+    async def find_missing(self, bot: Bot, user_id: int, channels: List[Dict],
+                           is_joined: Callable[[str], bool], fresh: bool = False,
+                           first_only: bool = False) -> List[Dict]:
+        """
+        Find the channels a user has not joined, checking all channels at once
+        
+        Cached statuses are used first, then statuses recorded from
+        chat_member updates (no older than RECORD_TTL). The remaining
+        channels are checked in parallel (one round trip instead of one per
+        channel), each call bounded by `timeout`. Channels whose circuit is
+        open are skipped (not required), and so are channels whose check
+        failed (API error, flood limit, timeout): an outage must not lock
+        users out before the breaker trips.
+        
+        With first_only, the outstanding checks are cancelled as soon as one
+        channel is known to be missing: enough for a yes/no gate, but the
+        result then holds only the channels confirmed so far. Callers that
+        show a join prompt must check every channel.
+        
+        Args:
+            bot: Bot used for API calls
+            user_id: Telegram user ID
+            channels: Force join channel dicts (need 'channel_id')
+            is_joined: Decides whether a status counts as joined
+            fresh: Skip the cache and recorded statuses for every channel
+            first_only: Stop at the first missing channel
+        
+        Returns:
+            Missing channels, in the order given
+        """
+        # Broken channels must not lock everyone out
+        channels = [channel for channel in channels if self.is_channel_available(channel['channel_id'])]
+        missing_ids = set()
+        pending = []
+        
+        for channel in channels:
+            status = None if fresh else self.get_cached(user_id, channel['channel_id'])
+            if status is None:
+                pending.append(channel)
+            else:
+                self.hits += 1
+                if not is_joined(status):
+                    missing_ids.add(channel['channel_id'])
+        
+        # Statuses recorded from chat_member updates, one query for all channels
+        if pending and not (first_only and missing_ids) and not fresh:
+            recorded = await db.get_channel_memberships(
+                user_id, [channel['channel_id'] for channel in pending], self.record_ttl
+            )
+            unknown = []
+            
+            for channel in pending:
+                status = recorded.get(channel['channel_id'])
+                if status is None:
+                    unknown.append(channel)
+                    continue
+                
+                self.recorded_hits += 1
+                self.set(user_id, channel['channel_id'], status)
+                if not is_joined(status):
+                    missing_ids.add(channel['channel_id'])
+            
+            pending = unknown
+        
+        if first_only and missing_ids:
+            # Decision made, the rest stays unchecked
+            pending = []
+        
+        tasks = {
+            asyncio.create_task(self._fetch_status(bot, user_id, channel['channel_id'])): channel
+            for channel in pending
+        }
+        remaining = set(tasks)
+        
+        try:
+            while remaining and not (first_only and missing_ids):
+                done, remaining = await asyncio.wait(remaining, return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    channel = tasks[task]
+                    try:
+                        status = task.result()
+                    except (TelegramError, asyncio.TimeoutError) as e:
+                        logger.error(f"Error checking membership for channel {channel['channel_id']}: {e or 'timeout'}")
+                        continue
+                    
+                    if not is_joined(status):
+                        missing_ids.add(channel['channel_id'])
+        finally:
+            for task in remaining:
+                task.cancel()
+        
+        return [channel for channel in channels if channel['channel_id'] in missing_ids]
+    
+    async def _fetch_status(self, bot: Bot, user_id: int, channel_id: int) -> str:
+        async with self._semaphore:
+            try:
+                status = await asyncio.wait_for(
+                    self.get_status(bot, user_id, channel_id, fresh=True),
+                    timeout=self.timeout
+                )
+            except RetryAfter:
+                # Bot-wide flood limit, says nothing about the channel
+                raise
+            except (TelegramError, asyncio.TimeoutError) as e:
+                self._record_failure(bot, channel_id, user_id, e)
+                raise
+        
+        self._record_success(channel_id)
+        await db.set_channel_membership(user_id, channel_id, status)
+        return status
+    
+    # ==================== CHANNEL HEALTH ====================
+    
+    def is_channel_available(self, channel_id: int) -> bool:
+        """False while the channel's circuit is open"""
+        health = self._health.get(channel_id)
+        return health is None or health.opened_until <= time.monotonic()
+    
+    def get_channel_health(self, channel_id: int) -> Dict:
+        """Health summary for the admin panel"""
+        health = self._health.get(channel_id) or ChannelHealth()
+        return {
+            'state': health.state(self.breaker_threshold),
+            'failures': health.failures,
+            'last_error': health.last_error,
+            'retry_in': max(0, int(health.opened_until - time.monotonic()))
+        }
+    
+    def _record_success(self, channel_id: int):
+        health = self._health.get(channel_id)
+        if health is None:
+            return
+        if health.failures >= self.breaker_threshold:
+            logger.info(f"✅ Force join channel {channel_id} recovered")
+        del self._health[channel_id]
+    
+    def _record_failure(self, bot: Bot, channel_id: int, user_id: int, error: Exception):
+        if isinstance(error, asyncio.TimeoutError):
+            health = self._health.setdefault(channel_id, ChannelHealth())
+            if user_id in health.timeout_users:
+                return
+            health.timeout_users.add(user_id)
+        elif is_channel_error(error):
+            health = self._health.setdefault(channel_id, ChannelHealth())
+        else:
+            # About this user (or a network blip), not the channel
+            return
+        
+        health.failures += 1
+        health.last_error = str(error) or type(error).__name__
+        
+        if health.failures < self.breaker_threshold:
+            return
+        
+        health.opened_until = time.monotonic() + self.breaker_cooldown
+        logger.warning(
+            f"⛔ Force join channel {channel_id} paused for {self.breaker_cooldown}s "
+            f"after {health.failures} failures: {health.last_error}"
+        )
+        
+        if not health.alerted:
+            health.alerted = True
+            task = asyncio.create_task(self._alert_admins(bot, channel_id, health.last_error))
+            self._alerts.add(task)
+            task.add_done_callback(self._alerts.discard)
+    
+    async def _alert_admins(self, bot: Bot, channel_id: int, error: str):
+        """One-time notice to admins that a force join channel is broken"""
+        text = (
+            f"⚠️ FORCE JOIN CHANNEL FAILING\n\n"
+            f"Channel {channel_id} could not be checked: {error}\n\n"
+            f"It is skipped for membership checks until it recovers. "
+            f"Make sure the bot is still an admin there, or remove the channel "
+            f"from the Force Join Manager."
+        )
+        
+        admin_ids = {admin['user_id'] for admin in await db.get_all_admins() if admin.get('active')}
+        if BotConfig.OWNER_ID:
+            admin_ids.add(BotConfig.OWNER_ID)
+        
+        for admin_id in admin_ids:
+            try:
+                await bot.send_message(chat_id=admin_id, text=text)
+            except TelegramError as e:
+                logger.error(f"Error alerting admin {admin_id}: {e}")
+    
+    async def record(self, user_id: int, channel_id: int, status: str, observed_at: datetime = None):
+        """Store a status reported by a chat_member update sent at observed_at"""
+        status = str(status)
+        self.set(user_id, channel_id, status)
+        await db.set_channel_membership(user_id, channel_id, status, observed_at)
+    
+    def get_cached(self, user_id: int, channel_id: int) -> Optional[str]:
+        """Cached status, or None if missing/expired"""
+        key = (user_id, channel_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        status, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._cache[key]
+            return None
+        return status
+    
+    def set(self, user_id: int, channel_id: int, status: str):
+        """Store a status with the TTL matching its outcome"""
+        ttl = self.negative_ttl if status in NOT_MEMBER_STATUSES else self.positive_ttl
+        key = (user_id, channel_id)
+        
+        self._cache[key] = (status, time.monotonic() + ttl)
+        self._cache.move_to_end(key)
+        
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+    
+    def invalidate(self, user_id: int, channel_id: int = None):
+        """Drop one entry, or every channel of a user"""
+        if channel_id is not None:
+            self._cache.pop((user_id, channel_id), None)
+            return
+        
+        for key in [key for key in self._cache if key[0] == user_id]:
+            del self._cache[key]
+    
+    def clear(self):
+        """Drop every cached status"""
+        self._cache.clear()
+    
+    def get_stats(self) -> Dict:
+        """Cache size and hit ratio"""
+        total = self.hits + self.recorded_hits + self.misses
+        return {
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'recorded_hits': self.recorded_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.recorded_hits) / total, 3) if total else 0.0
+        }
+
+
+# Global membership service instance
+membership_service = MembershipService()
@@ -0,0 +1,190 @@
+# 🔀 Model Router - Fallback chain and latency-driven hedged requests
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from config import AIConfig
+from services.ai_scheduler import ai_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AttemptTiming:
+    """Clock of one HTTP attempt, see ModelRouter.timing()"""
+    
+    def __init__(self):
+        self.started = time.monotonic()
+        self.answered = False
+    
+    def succeeded(self):
+        self.answered = True
+    
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+class ModelRouter:
+    """
+    Run one AI request across a chain of models
+    
+    The primary model gets the request first. If it has not answered by
+    its observed p90 latency, a hedge request fires to the next model in
+    the chain and whichever answers first wins; the loser is cancelled. A
+    model that fails outright hands over to the next one immediately.
+    
+    Latencies are kept per model in a rolling window, one sample per HTTP
+    attempt measured from the moment it holds a scheduler slot, so queue
+    waits, 429 backoff and retry sleeps don't count against the model. An
+    attempt cancelled mid-flight (a hedge loser) adds its elapsed time as
+    a lower bound, so a model that always loses still gets slower samples.
+    Until a model has HEDGE_MIN_SAMPLES of them, HEDGE_DEFAULT_DELAY is
+    used as its threshold. No hedge is fired while the scheduler has no
+    free slot (queue or 429 backoff), as it would only add load.
+    
+    Usage:
+        result = await model_router.run(self.models, lambda model: self._call_model(model, ...))
+        
+        # inside the attempt
+        async with ai_scheduler.slot(priority), model_router.timing(model) as timing, session.post(...):
+            ...
+            timing.succeeded()
+    """
+    
+    def __init__(self):
+        self.enabled = AIConfig.HEDGE_ENABLED
+        self.min_samples = AIConfig.HEDGE_MIN_SAMPLES
+        self.default_delay = AIConfig.HEDGE_DEFAULT_DELAY
+        self.min_delay = AIConfig.HEDGE_MIN_DELAY
+        self._latencies: Dict[str, Deque[float]] = {}
+        self.hedges = 0
+        self.secondary_wins = 0  # answered by a hedge or fallback model
+        self.fallbacks = 0
+    
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait on `model` before hedging: its p90 latency"""
+        samples = self._latencies.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(samples)
+        return max(self.min_delay, ordered[int(len(ordered) * 0.9)])
+    
+    def record_latency(self, model: str, seconds: float):
+        samples = self._latencies.setdefault(model, deque(maxlen=AIConfig.LATENCY_WINDOW))
+        samples.append(seconds)
+    
+    @asynccontextmanager
+    async def timing(self, model: str):
+        """
+        Time one attempt: recorded when marked succeeded, or as a lower
+        bound when cancelled; failed attempts are not recorded
+        """
+        timing = AttemptTiming()
+        try:
+            yield timing
+        except asyncio.CancelledError:
+            self.record_latency(model, timing.elapsed())
+            raise
+        if timing.answered:
+            self.record_latency(model, timing.elapsed())
+    
+    async def run(self, models: List[str], attempt: Callable[[str], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Call attempt(model) along the chain until one returns a result
+        
+        Args:
+            models: Primary model first, then fallbacks in order
+            attempt: One complete call (with its own retries), None on failure
+        
+        Returns:
+            The first non-None result, or None if every model failed
+        """
+        _, result = await self.route(models, attempt)
+        return result
+    
+    async def route(self, models: List[str],
+                    attempt: Callable[[str], Awaitable[Optional[str]]]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Like run(), but also tells which model answered
+        
+        Returns:
+            (model, result), or (None, None) if every model failed
+        """
+        if len(models) == 1:
+            result = await self._guarded(models[0], attempt)
+            return (models[0] if result is not None else None), result
+        
+        tasks: Dict[asyncio.Task, str] = {}
+        next_index = 0
+        
+        def launch():
+            nonlocal next_index
+            model = models[next_index]
+            next_index += 1
+            tasks[asyncio.create_task(self._guarded(model, attempt))] = model
+        
+        launch()
+        pending = set(tasks)
+        try:
+            while pending:
+                can_hedge = self.enabled and next_index < len(models)
+                timeout = self.hedge_delay(models[next_index - 1]) if can_hedge else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                failed = False
+                for task in done:
+                    result = task.result()
+                    if result is not None:
+                        if tasks[task] != models[0]:
+                            self.secondary_wins += 1
+                        return tasks[task], result
+                    failed = True
+                
+                if next_index >= len(models):
+                    continue
+                if failed:
+                    self.fallbacks += 1
+                    logger.warning(f"🔀 {models[next_index - 1]} failed, falling back to {models[next_index]}")
+                elif ai_scheduler.has_capacity():
+                    self.hedges += 1
+                    logger.info(f"🔀 {models[next_index - 1]} slow, hedging with {models[next_index]}")
+                else:
+                    continue
+                launch()
+                pending = {task for task in tasks if not task.done()}
+            
+            return None, None
+        
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let the losers unwind so their slots and connections are free before we return
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    @staticmethod
+    async def _guarded(model: str, attempt: Callable[[str], Awaitable[Optional[str]]]) -> Optional[str]:
+        try:
+            return await attempt(model)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Unexpected error calling {model}: {e}")
+            return None
+    
+    def get_stats(self) -> Dict:
+        """Hedge threshold and sample count per model, plus hedge counters"""
+        return {
+            'models': {
+                model: {'samples': len(samples), 'hedge_delay': round(self.hedge_delay(model), 2)}
+                for model, samples in self._latencies.items()
+            },
+            'hedges': self.hedges,
+            'secondary_wins': self.secondary_wins,
+            'fallbacks': self.fallbacks
+        }
+
+
+# Global model router instance
+model_router = ModelRouter()
@@ -0,0 +1,115 @@
+# 🧾 Payment Proof Index - Perceptual hashes of analyzed proofs for duplicate detection
+
+import json
+import logging
+from typing import Dict, Optional
+from config import AIConfig
+from database.db import db
+
+logger = logging.getLogger(__name__)
+
+BANDS = 4        # 64-bit hash split into 4 x 16-bit bands
+BAND_BITS = 16
+
+
+def _signed(value: int) -> int:
+    """Unsigned 64-bit hash -> BIGINT"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _bands(value: int):
+    return [(value >> (BAND_BITS * i)) & 0xFFFF for i in range(BANDS)]
+
+
+class PaymentProofIndex:
+    """
+    dHash index of every payment proof the vision model has analyzed
+    
+    Each row keeps the hash, the parsed JSON result and the extracted
+    transaction ID. A new submission whose hash is within MATCH_DISTANCE
+    bits of a stored one is answered from the row, with no model call.
+    
+    Lookups use banded LSH: the hash is stored as 4 indexed 16-bit bands,
+    and two hashes within 3 bits of each other must agree on at least one
+    band (pigeonhole), so one indexed OR query finds every candidate and
+    the exact Hamming distance is checked in Python.
+    """
+    
+    def __init__(self):
+        # Band matching only guarantees recall up to BANDS - 1 bits
+        self.max_distance = min(AIConfig.PROOF_MATCH_DISTANCE, BANDS - 1)
+    
+    async def find_similar(self, fingerprint: int) -> Optional[Dict]:
+        """
+        Closest stored proof within max_distance bits
+        
+        Returns:
+            {'id', 'user_id', 'result', 'transaction_id', 'created_at', 'distance'} or None
+        """
+        bands = _bands(fingerprint)
+        try:
+            rows = await db.fetch(
+                """SELECT id, user_id, dhash, result, transaction_id, created_at
+                   FROM payment_proof_hashes
+                   WHERE band0 = $1 OR band1 = $2 OR band2 = $3 OR band3 = $4""",
+                *bands
+            )
+        except Exception as e:
+            logger.error(f"Error searching proof index: {e}")
+            return None
+        
+        best = None
+        for row in rows:
+            distance = bin((row['dhash'] & 0xFFFFFFFFFFFFFFFF) ^ fingerprint).count('1')
+            if distance <= self.max_distance and (best is None or distance < best['distance']):
+                best = {
+                    'id': row['id'],
+                    'user_id': row['user_id'],
+                    'result': json.loads(row['result']),
+                    'transaction_id': row['transaction_id'],
+                    'created_at': row['created_at'],
+                    'distance': distance
+                }
+        return best
+    
+    async def find_by_transaction(self, transaction_id: str) -> Optional[Dict]:
+        """Earliest proof carrying this transaction ID (a different image reusing it)"""
+        try:
+            row = await db.fetchrow(
+                """SELECT id, user_id, created_at FROM payment_proof_hashes
+                   WHERE transaction_id = $1 ORDER BY id LIMIT 1""",
+                transaction_id
+            )
+            return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error searching proofs by transaction: {e}")
+            return None
+    
+    async def record(self, fingerprint: int, result: Dict, user_id: Optional[int]) -> Optional[int]:
+        """Store an analyzed proof, returns its index ID"""
+        transaction_id = normalize_transaction_id(result.get('transaction_id'))
+        try:
+            return await db.fetchval(
+                """INSERT INTO payment_proof_hashes
+                   (dhash, band0, band1, band2, band3, result, transaction_id, user_id)
+                   VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                   RETURNING id""",
+                _signed(fingerprint), *_bands(fingerprint), json.dumps(result), transaction_id, user_id
+            )
+        except Exception as e:
+            logger.error(f"Error recording payment proof: {e}")
+            return None
+
+
+def normalize_transaction_id(value) -> Optional[str]:
+    """Transaction ID as extracted by the model, None for missing/'null'"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.lower() in ('null', 'none', 'n/a', ''):
+        return None
+    return value
+
+
+# Global payment proof index instance
+proof_index = PaymentProofIndex()
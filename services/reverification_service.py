@@ -0,0 +1,117 @@
+# 🔁 Re-verification Sweeper - Catch verified users who left force join channels
+
+import asyncio
+import logging
+from typing import Dict, Optional
+from telegram import Bot
+from config import AppConfig
+from database.db import db
+from services.membership_service import membership_service
+
+logger = logging.getLogger(__name__)
+
+JOINED_STATUSES = ('member', 'administrator', 'creator')
+
+
+class ReverificationSweeper:
+    """
+    Background sweep that re-checks verified users against force join channels
+    
+    force_join_middleware trusts is_verified, so the interactive path never
+    calls the API. This sweep keeps that flag honest: it pages through
+    verified users, most recently active first, checks their membership
+    (cache, then recorded chat_member statuses, then get_chat_member) and
+    revokes verification for leavers in one bulk update per batch.
+    
+    API calls are paced to REVERIFY_API_RATE per second; users answered
+    from the cache or the memberships table cost nothing.
+    """
+    
+    def __init__(self):
+        self.batch_size = AppConfig.REVERIFY_BATCH_SIZE
+        self.api_rate = AppConfig.REVERIFY_API_RATE
+        self.active_days = AppConfig.REVERIFY_ACTIVE_DAYS
+        self.interval = AppConfig.REVERIFY_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self.last_sweep: Dict = {}
+    
+    def start(self, bot: Bot):
+        """Start sweeping in the background"""
+        if AppConfig.REVERIFY_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run(bot))
+    
+    async def stop(self):
+        """Stop the sweep task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self, bot: Bot):
+        while True:
+            try:
+                await self.sweep(bot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in re-verification sweep: {e}")
+            await asyncio.sleep(self.interval)
+    
+    async def sweep(self, bot: Bot) -> Dict:
+        """
+        Run one full pass over recently active verified users
+        
+        Returns:
+            {'checked', 'revoked', 'api_calls'}
+        """
+        stats = {'checked': 0, 'revoked': 0, 'api_calls': 0}
+        channels = await db.get_force_join_channels()
+        if not channels:
+            return stats
+        
+        after = None
+        while True:
+            users = await db.get_verified_users_by_activity(self.batch_size, self.active_days, after)
+            if not users:
+                break
+            after = (users[-1]['last_active'], users[-1]['user_id'])
+            leavers = []
+            
+            for user in users:
+                user_id = user['user_id']
+                if db.admins.is_admin(user_id):
+                    continue
+                
+                misses = membership_service.misses
+                missing = await membership_service.find_missing(
+                    bot, user_id, channels, is_joined=lambda status: status in JOINED_STATUSES,
+                    first_only=True
+                )
+                stats['checked'] += 1
+                if missing:
+                    leavers.append(user_id)
+                
+                # Pace by API calls actually made
+                api_calls = membership_service.misses - misses
+                if api_calls:
+                    stats['api_calls'] += api_calls
+                    await asyncio.sleep(api_calls / self.api_rate)
+            
+            revoked = await db.unverify_users(leavers)
+            stats['revoked'] += len(revoked)
+            if revoked:
+                logger.info(f"🔁 Re-verification revoked {len(revoked)} users who left force join channels")
+        
+        self.last_sweep = stats
+        logger.info(
+            f"✅ Re-verification sweep done: {stats['checked']} checked, "
+            f"{stats['revoked']} revoked, {stats['api_calls']} API calls"
+        )
+        return stats
+
+
+# Global re-verification sweeper instance
+reverification_sweeper = ReverificationSweeper()
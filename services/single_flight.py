@@ -0,0 +1,60 @@
+# 🛫 Single Flight - Share one in-flight call among identical concurrent requests
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one
+    
+    The first caller for a key starts the work as a task; callers that
+    arrive while it runs await the same task instead of starting their
+    own. The key is forgotten as soon as the task finishes, so later calls
+    run again (caching results is the caller's job).
+    
+    Every caller awaits the task through asyncio.shield: one caller being
+    cancelled (e.g. its update handler timing out) does not cancel the
+    work the others are waiting on.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.shared = 0
+    
+    async def do(self, key: str, factory: Callable[[], Awaitable]):
+        """
+        Run factory() once per key at a time
+        
+        Args:
+            key: Identity of the request (equal keys = interchangeable results)
+            factory: Starts the work, only called by the first caller
+        
+        Returns:
+            The shared result; an exception raised by the work is raised to every caller
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+            logger.info(f"🛫 Joined in-flight request {key[:12]}")
+        
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: str, task: asyncio.Task):
+        self._calls.pop(key, None)
+        # Mark the exception retrieved even if every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls running"""
+        return len(self._calls)
@@ -0,0 +1,233 @@
+# ⏱️ Database Micro-Benchmarks - Hot queries timed against a seeded Postgres
+#
+# Usage (from the repository root, after tools/seed_dataset.py):
+#   python -m tools.bench_db                          # print results
+#   python -m tools.bench_db --save-baseline          # record tools/bench_baseline.json
+#   python -m tools.bench_db --check                  # exit 1 on regression (CI)
+#
+# Baselines are only comparable on the same machine and dataset, so record
+# one on the CI runner itself rather than committing numbers from a laptop.
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+from config import DatabaseConfig
+from database.db import db
+from models.wishlist import Wishlist
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'bench_baseline.json'
+
+
+class Benchmark:
+    """One timed operation; factory(rng) returns a fresh coroutine per call"""
+
+    def __init__(self, name: str, factory: Callable[[random.Random], Awaitable], weight: float = 1.0,
+                 use_memory_index: bool = True):
+        self.name = name
+        self.factory = factory
+        self.weight = weight  # fraction of --iterations, heavy queries run fewer times
+        self.use_memory_index = use_memory_index  # False: user flags / admin registry bypassed
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+async def load_fixtures(rng: random.Random, sample_size: int) -> Dict:
+    """Pick existing user and course IDs from the seeded dataset"""
+    users = [row['user_id'] for row in await db.fetch(
+        "SELECT user_id FROM users TABLESAMPLE SYSTEM (1) LIMIT $1", sample_size
+    )]
+    if not users:
+        users = [row['user_id'] for row in await db.fetch("SELECT user_id FROM users LIMIT $1", sample_size)]
+    courses = [row['id'] for row in await db.fetch("SELECT id FROM courses WHERE deleted_at IS NULL LIMIT 1000")]
+
+    if not users or not courses:
+        raise RuntimeError("Database is empty, run `python -m tools.seed_dataset` first")
+
+    rng.shuffle(users)
+    return {'users': users, 'courses': courses}
+
+
+async def get_force_join_channels_cold():
+    """Channel list with the in-memory copy dropped first, so the query itself is timed"""
+    await db._bump_force_join_version()
+    return await db.get_force_join_channels()
+
+
+def build_benchmarks(fixtures: Dict) -> List[Benchmark]:
+    users, courses = fixtures['users'], fixtures['courses']
+
+    return [
+        Benchmark('get_or_create_user', lambda rng: db.get_or_create_user(rng.choice(users))),
+        Benchmark('is_user_verified', lambda rng: db.is_user_verified(rng.choice(users))),
+        Benchmark('is_user_verified[db]', lambda rng: db.is_user_verified(rng.choice(users)),
+                  use_memory_index=False),
+        Benchmark('is_admin', lambda rng: db.is_admin(rng.choice(users))),
+        Benchmark('is_admin[db]', lambda rng: db.is_admin(rng.choice(users)), use_memory_index=False),
+        Benchmark('get_force_join_channels', lambda rng: db.get_force_join_channels()),
+        Benchmark('get_force_join_channels[db]', lambda rng: get_force_join_channels_cold()),
+        # Full-table aggregates, a handful of runs is enough
+        Benchmark('get_user_stats', lambda rng: db.get_user_stats(), weight=0.02),
+        Benchmark('Wishlist.toggle', lambda rng: Wishlist.toggle(rng.choice(users), rng.choice(courses))),
+    ]
+
+
+async def run_benchmark(bench: Benchmark, iterations: int, concurrency: int, warmup: int, seed: int) -> Dict:
+    """Run one benchmark with `concurrency` workers sharing the iteration budget"""
+    rng = random.Random(seed)
+    total = max(concurrency, int(iterations * bench.weight))
+    latencies: List[float] = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter_ns()
+            await bench.factory(rng)
+            latencies.append((time.perf_counter_ns() - started) / 1e6)
+
+    flags_loaded, admins_loaded = db.user_flags.loaded, db.admins.loaded
+    db.user_flags.loaded = flags_loaded and bench.use_memory_index
+    db.admins.loaded = admins_loaded and bench.use_memory_index
+    try:
+        for _ in range(max(1, int(warmup * bench.weight))):
+            await bench.factory(rng)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        db.user_flags.loaded, db.admins.loaded = flags_loaded, admins_loaded
+
+    latencies.sort()
+    return {
+        'ops': len(latencies),
+        'ops_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0
+    }
+
+
+def print_results(results: Dict[str, Dict]):
+    print(f"{'benchmark':<30}{'ops':>8}{'ops/sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<30}{r['ops']:>8}{r['ops_per_sec']:>12.1f}{r['p50_ms']:>10.3f}"
+              f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['max_ms']:>10.3f}")
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions beyond tolerance in throughput or p95 latency"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if current['ops_per_sec'] < base['ops_per_sec'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {current['ops_per_sec']:.1f} ops/sec vs baseline {base['ops_per_sec']:.1f}"
+            )
+        # Sub-0.1 ms latencies are noise, compare against a floor
+        if current['p95_ms'] > max(base['p95_ms'], 0.1) * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']:.3f} ms vs baseline {base['p95_ms']:.3f} ms")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    DatabaseConfig.DATABASE_URL = args.dsn
+    await db.connect()
+
+    try:
+        rng = random.Random(args.seed)
+        fixtures = await load_fixtures(rng, args.sample)
+        benchmarks = build_benchmarks(fixtures)
+        if args.only:
+            benchmarks = [b for b in benchmarks if b.name in args.only]
+
+        results = {}
+        for i, bench in enumerate(benchmarks):
+            logger.info(f"⏱️ {bench.name}")
+            results[bench.name] = await run_benchmark(
+                bench, args.iterations, args.concurrency, args.warmup, args.seed + i
+            )
+
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'postgres': await db.fetchval("SHOW server_version"),
+                'users': await db.fetchval("SELECT reltuples::BIGINT FROM pg_class WHERE relname = 'users'"),
+                'iterations': args.iterations,
+                'concurrency': args.concurrency
+            },
+            'results': results
+        }
+    finally:
+        await db.disconnect()
+
+    print_results(results)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        logger.info(f"💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if args.check:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            logger.error(f"❌ No baseline at {baseline_path}, run with --save-baseline first")
+            return 2
+
+        regressions = compare(results, json.loads(baseline_path.read_text())['results'], args.tolerance)
+        if regressions:
+            for line in regressions:
+                logger.error(f"❌ Regression: {line}")
+            return 1
+        logger.info("✅ No regressions against baseline")
+
+    return 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark hot Botavik database queries")
+    parser.add_argument('--dsn', default=DatabaseConfig.DATABASE_URL, help="Seeded database (default: DATABASE_URL)")
+    parser.add_argument('--iterations', type=int, default=5000, help="Calls per benchmark (default: 5000)")
+    parser.add_argument('--concurrency', type=int, default=10, help="Concurrent callers (default: 10)")
+    parser.add_argument('--warmup', type=int, default=200, help="Untimed calls before measuring (default: 200)")
+    parser.add_argument('--sample', type=int, default=10000, help="User IDs sampled as inputs (default: 10000)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for inputs")
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="Run only these benchmarks")
+    parser.add_argument('--output', help="Also write the JSON report here")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON path")
+    parser.add_argument('--save-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--check', action='store_true', help="Compare with the baseline, exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed slowdown before failing --check (default: 0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sys.exit(asyncio.run(run(parse_args(argv))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# 📡 Stream Renderer - Progressive Telegram message edits for streamed AI output
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+from telegram import Message, InlineKeyboardMarkup
+from telegram.error import BadRequest, RetryAfter, TelegramError
+from config import AIConfig
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+CURSOR = " ▌"
+INTERRUPTED_NOTE = "\n\n⚠️ Answer interrupted, it may be incomplete. Please try again."
+
+
+class StreamInterrupted(Exception):
+    """Raised by a chunk stream that broke off after output had started"""
+
+
+class StreamRenderer:
+    """
+    Edit one Telegram message as AI text streams in
+    
+    The first chunk is shown right away, later edits are throttled to one
+    per STREAM_EDIT_INTERVAL seconds (Telegram rate-limits edits per chat)
+    and a RetryAfter pushes the next edit back instead of failing. The
+    final edit adds the footer and keyboard; text beyond Telegram's
+    message limit continues in follow-up messages. A stream that raises
+    StreamInterrupted is finalized with a warning, so a truncated answer
+    doesn't pass for a complete one.
+    
+    Usage:
+        status = await update.message.reply_text("🔍 Analyzing...")
+        text = await StreamRenderer(status, header="✅ RESULT\\n\\n").render(
+            ai_service.analyze_image_stream(url), reply_markup=keyboard
+        )
+    """
+    
+    def __init__(self, message: Message, header: str = "", footer: str = "",
+                 interval: float = None):
+        self.message = message
+        self.header = header
+        self.footer = footer
+        self.interval = AIConfig.STREAM_EDIT_INTERVAL if interval is None else interval
+        self._next_edit = 0.0
+        self._shown = ""
+    
+    async def render(self, chunks: AsyncIterator[str],
+                     reply_markup: Optional[InlineKeyboardMarkup] = None) -> str:
+        """
+        Consume the stream, editing the message along the way
+        
+        Returns:
+            The full streamed text (empty if the stream produced nothing,
+            in which case the message is left for the caller to update)
+        """
+        text = ""
+        interrupted = False
+        try:
+            async for chunk in chunks:
+                text += chunk
+                if time.monotonic() >= self._next_edit:
+                    await self._edit(self._fit(self.header + text) + CURSOR)
+        except StreamInterrupted:
+            interrupted = True
+        
+        text = text.strip()
+        if text:
+            await self._finish(text, reply_markup, interrupted)
+        return text
+    
+    async def _finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup],
+                      interrupted: bool = False):
+        full = self.header + text + (INTERRUPTED_NOTE if interrupted else "") + self.footer
+        parts = [full[i:i + MAX_MESSAGE_LENGTH] for i in range(0, len(full), MAX_MESSAGE_LENGTH)]
+        
+        # The final edit must land, wait out any rate limit
+        delay = self._next_edit - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        await self._edit(parts[0], reply_markup if len(parts) == 1 else None, final=True)
+        for i, part in enumerate(parts[1:], start=2):
+            await self.message.reply_text(part, reply_markup=reply_markup if i == len(parts) else None)
+    
+    @staticmethod
+    def _fit(text: str) -> str:
+        """Trim an in-progress preview to the message limit"""
+        limit = MAX_MESSAGE_LENGTH - len(CURSOR)
+        return text if len(text) <= limit else text[:limit - 1] + "…"
+    
+    async def _edit(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None,
+                    final: bool = False):
+        if text == self._shown and not final:
+            return
+        
+        self._next_edit = time.monotonic() + self.interval
+        try:
+            await self.message.edit_text(text, reply_markup=reply_markup)
+            self._shown = text
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            self._next_edit = time.monotonic() + retry_after
+            if final:
+                await asyncio.sleep(retry_after)
+                await self._edit(text, reply_markup, final=True)
+        except BadRequest as e:
+            # Same text as before, nothing to do
+            if 'not modified' not in str(e).lower():
+                logger.error(f"Error editing streamed message: {e}")
+        except TelegramError as e:
+            logger.error(f"Error editing streamed message: {e}")